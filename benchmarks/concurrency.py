@@ -0,0 +1,56 @@
+"""Throughput and latency of a running server under concurrent GETs.
+
+Run it once against the WSGI workers and once against the ASGI app, with the
+same number of processes, e.g.
+
+    gunicorn -w 4 src:app
+    uvicorn --workers 4 src.asgi:application
+    python -m benchmarks.concurrency --url http://127.0.0.1:8000 --concurrency 64 / /shows /artists/1
+"""
+import argparse
+import http.client
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+
+def fetch(host, port, path):
+    connection = http.client.HTTPConnection(host, port, timeout=30)
+    start = time.perf_counter()
+    try:
+        connection.request('GET', path)
+        response = connection.getresponse()
+        response.read()
+        ok = response.status < 500
+    except OSError:
+        ok = False
+    finally:
+        connection.close()
+    return time.perf_counter() - start, ok
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('paths', nargs='*', default=['/', '/venues', '/artists', '/shows'])
+    parser.add_argument('--url', default='http://127.0.0.1:5000')
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    url = urlsplit(args.url)
+    paths = [args.paths[i % len(args.paths)] for i in range(args.requests)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.concurrency) as pool:
+        results = list(pool.map(lambda p: fetch(url.hostname, url.port or 80, p), paths))
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(t for t, _ in results)
+    errors = sum(1 for _, ok in results if not ok)
+    print('%d requests, concurrency %d: %.0f req/s, p50 %.1f ms, p99 %.1f ms, %d errors' % (
+        len(results), args.concurrency, len(results) / elapsed,
+        statistics.median(latencies) * 1000, latencies[int(len(latencies) * 0.99) - 1] * 1000, errors))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""Per-row cost of the `datetime` filter on a 10k show /shows page.
+
+Compares the old path (str() in the view, dateutil + babel per tile) with
+src.dates, both on their own and rendering pages/shows.html.
+
+    python -m benchmarks.datetime_filter [--rows 10000]
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+
+import babel.dates
+import dateutil.parser
+from flask import render_template
+
+
+def legacy_format_datetime(value, format='medium'):
+    date = dateutil.parser.parse(value)
+    if format == 'full':
+        format = "EEEE MMMM, d, y 'at' h:mma"
+    elif format == 'medium':
+        format = "EE MM, dd, y h:mma"
+    return babel.dates.format_datetime(date, format)
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=10000)
+    args = parser.parse_args()
+
+    from src.app import create_app
+    from src.pagination import Page
+
+    app = create_app()
+
+    start = datetime(2026, 1, 1, 20, 0)
+    times = [start + timedelta(hours=i) for i in range(args.rows)]
+    datetime_filter = app.jinja_env.filters['datetime']
+
+    def shows(as_str):
+        return [{
+            "venue_id": 1, "venue_name": "The Musical Hop",
+            "artist_id": 1, "artist_name": "Guns N Petals", "artist_image_link": "",
+            "start_time": str(t) if as_str else t,
+        } for t in times]
+
+    def render(data):
+        with app.test_request_context('/shows'):
+            render_template('pages/shows.html', shows=data, page=Page([]))
+
+    results = {
+        'filter, legacy': timed(lambda: [legacy_format_datetime(str(t), 'full') for t in times]),
+        'filter, src.dates': timed(lambda: [datetime_filter(t, 'full') for t in times]),
+    }
+    legacy_shows, new_shows = shows(True), shows(False)
+    app.jinja_env.filters['datetime'] = legacy_format_datetime
+    results['render, legacy'] = timed(lambda: render(legacy_shows))
+    app.jinja_env.filters['datetime'] = datetime_filter
+    results['render, src.dates'] = timed(lambda: render(new_shows))
+
+    for name, seconds in results.items():
+        print('%-20s %8.1f ms total %8.2f us/row' % (name, seconds * 1000, seconds / args.rows * 1e6))
+
+
+if __name__ == '__main__':
+    main()
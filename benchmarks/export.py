@@ -0,0 +1,42 @@
+"""Export throughput (rows/s) and peak Python memory per table and format.
+
+Runs against the configured database, seed it first for meaningful numbers.
+
+    python -m benchmarks.export [--batch-size 5000]
+"""
+import argparse
+import time
+import tracemalloc
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--batch-size', type=int, default=5000)
+    args = parser.parse_args()
+
+    from src.app import create_app
+    from src.models import db
+
+    app = create_app()
+    from src.export import EXPORTS, encode, gzipped
+
+    with app.app_context():
+        for kind, model in EXPORTS.items():
+            rows = db.session.query(model.id).count()
+            for fmt in ('csv', 'ndjson'):
+                for compress in (False, True):
+                    chunks = encode(kind, fmt, args.batch_size)
+                    chunks = gzipped(chunks) if compress else (c.encode() for c in chunks)
+                    tracemalloc.start()
+                    start = time.perf_counter()
+                    size = sum(len(c) for c in chunks)
+                    elapsed = time.perf_counter() - start
+                    peak = tracemalloc.get_traced_memory()[1]
+                    tracemalloc.stop()
+                    print('%-8s %-7s %-5s %9d rows %10.0f rows/s %8.1f MB out %7.1f MB peak' % (
+                        kind, fmt, 'gzip' if compress else '', rows,
+                        rows / elapsed if elapsed else 0, size / 2 ** 20, peak / 2 ** 20))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,257 @@
+"""Latency, throughput, SQL queries and peak memory of every route in src/views.py.
+
+Drives the routes through the Flask test client against the configured
+database, which should be seeded first (benchmarks.seed, or --seed here).
+Write routes create, edit and delete rows; --read-only leaves them out.
+
+Results are written as JSON, and --compare prints the change against an
+earlier run and fails if a route's p50 got slower by more than --threshold:
+
+    python -m benchmarks.seed --venues 1000 --artists 2000 --shows 50000 --drop
+    python -m benchmarks.routes --output before.json
+    git checkout my-branch
+    python -m benchmarks.routes --output after.json --compare before.json
+
+For latency under concurrent load over HTTP, see benchmarks.concurrency.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+Route = namedtuple('Route', 'endpoint method path data write')
+
+
+def _venue_form(ids):
+    return {'name': 'Bench Venue', 'city': 'San Francisco', 'state': 'CA', 'address': '1 Main St',
+            'phone': '415-000-0000', 'genres': ['Jazz', 'Blues'], 'image_link': 'https://example.com/v.jpg',
+            'facebook_link': 'https://www.facebook.com/bench', 'website': 'https://example.com'}
+
+
+def _artist_form(ids):
+    return {'name': 'Bench Artist', 'city': 'San Francisco', 'state': 'CA', 'phone': '415-000-0000',
+            'genres': ['Rock n Roll'], 'image_link': 'https://example.com/a.jpg',
+            'facebook_link': 'https://www.facebook.com/bench', 'website': 'https://example.com'}
+
+
+def _show_form(ids):
+    start = datetime.now() + timedelta(days=30)
+    return {'venue_id': ids['venue'], 'artist_id': ids['artist'], 'start_time': start.strftime('%Y-%m-%d %H:%M:%S')}
+
+
+def _tour_form(ids):
+    # 20 fresh dates per request, so none collide with earlier runs
+    ids['tours'] = ids.get('tours', 0) + 1
+    start = datetime(2100, 1, 1) + timedelta(days=ids['tours'] * 30)
+    dates = ['%d, %s' % (ids['venue'], (start + timedelta(days=i)).strftime('%Y-%m-%d %H:%M')) for i in range(10)]
+    return {'artist_id': ids['artist'], 'dates': '\n'.join(dates), 'repeat_venue_id': ids['venue'],
+            'repeat_start': (start + timedelta(days=10)).strftime('%Y-%m-%d %H:%M'),
+            'repeat_every_days': 1, 'repeat_count': 10}
+
+
+ROUTES = [
+    Route('index', 'GET', '/', None, False),
+    Route('venues', 'GET', '/venues', None, False),
+    Route('search_venues', 'POST', '/venues/search', {'search_term': 'blue'}, False),
+    Route('show_venue', 'GET', lambda ids: '/venues/%d' % ids['venue'], None, False),
+    Route('venue_past_shows', 'GET', lambda ids: '/venues/%d/past-shows' % ids['venue'], None, False),
+    Route('create_venue_form', 'GET', '/venues/create', None, False),
+    Route('create_venue_submission', 'POST', '/venues/create', _venue_form, True),
+    Route('delete_venue', 'DELETE', lambda ids: '/venues/%d' % ids['doomed'].pop(), None, True),
+    Route('artists', 'GET', '/artists', None, False),
+    Route('search_artists', 'POST', '/artists/search', {'search_term': 'blue'}, False),
+    Route('show_artist', 'GET', lambda ids: '/artists/%d' % ids['artist'], None, False),
+    Route('artist_past_shows', 'GET', lambda ids: '/artists/%d/past-shows' % ids['artist'], None, False),
+    Route('edit_artist', 'GET', lambda ids: '/artists/%d/edit' % ids['artist'], None, False),
+    Route('edit_artist_submission', 'POST', lambda ids: '/artists/%d/edit' % ids['artist'], _artist_form, True),
+    Route('edit_venue', 'GET', lambda ids: '/venues/%d/edit' % ids['venue'], None, False),
+    Route('edit_venue_submission', 'POST', lambda ids: '/venues/%d/edit' % ids['venue'], _venue_form, True),
+    Route('create_artist_form', 'GET', '/artists/create', None, False),
+    Route('create_artist_submission', 'POST', '/artists/create', _artist_form, True),
+    Route('show_genre', 'GET', '/genres/Jazz', None, False),
+    Route('shows', 'GET', '/shows', None, False),
+    Route('create_shows', 'GET', '/shows/create', None, False),
+    Route('create_show_submission', 'POST', '/shows/create', _show_form, True),
+    Route('create_tour', 'GET', '/shows/create/tour', None, False),
+    Route('create_tour_submission', 'POST', '/shows/create/tour', _tour_form, True),
+]
+
+
+def sample_ids(db, Artist, Show, Venue, deletes):
+    """The busiest venue and artist, whose pages are the heaviest, and
+    `deletes` throwaway venues for the delete route."""
+    def busiest(key):
+        return db.session.query(key).group_by(key).order_by(db.func.count().desc()).limit(1).scalar()
+
+    ids = {'venue': busiest(Show.venue_id), 'artist': busiest(Show.artist_id)}
+    if ids['venue'] is None or ids['artist'] is None:
+        sys.exit('no shows in the database, seed it first (--seed)')
+    venues = [Venue(name='Doomed venue', city='Nowhere', state='CA') for _ in range(deletes)]
+    db.session.add_all(venues)
+    db.session.commit()
+    ids['doomed'] = [v.id for v in venues]
+    return ids
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def run_route(client, route, ids, iterations, warmup, queries):
+    def request():
+        path = route.path(ids) if callable(route.path) else route.path
+        data = route.data(ids) if callable(route.data) else route.data
+        response = client.open(path, method=route.method, data=data)
+        response.get_data()  # streamed pages render while being read
+        if response.status_code >= 500:
+            raise RuntimeError('%s %s: %s' % (route.method, path, response.status))
+        return response
+
+    for _ in range(warmup):
+        request()
+
+    latencies, counts = [], []
+    start = time.perf_counter()
+    for _ in range(iterations):
+        queries.clear()
+        t = time.perf_counter()
+        request()
+        latencies.append(time.perf_counter() - t)
+        counts.append(len(queries))
+    elapsed = time.perf_counter() - start
+
+    # memory is measured on a separate request, tracing slows everything down
+    tracemalloc.start()
+    response = request()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        'method': route.method,
+        'status': response.status_code,
+        'iterations': iterations,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+        'mean_ms': round(statistics.mean(latencies) * 1000, 3),
+        'requests_per_s': round(iterations / elapsed, 1),
+        'queries': max(counts),
+        'peak_memory_kb': round(peak / 1024, 1),
+    }
+
+
+def compare(results, baseline, threshold):
+    """Prints the p50 change per route, returns the routes that regressed."""
+    regressed = []
+    for name, now in results['routes'].items():
+        before = baseline['routes'].get(name)
+        if not before:
+            continue
+        change = now['p50_ms'] / before['p50_ms'] - 1 if before['p50_ms'] else 0
+        flag = ''
+        if change > threshold:
+            flag = '  REGRESSED'
+            regressed.append(name)
+        print('%-26s p50 %8.2f -> %8.2f ms (%+5.0f%%)  queries %3d -> %3d%s' % (
+            name, before['p50_ms'], now['p50_ms'], change * 100, before['queries'], now['queries'], flag))
+    return regressed
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('endpoints', nargs='*', help='Only these endpoints (default: all).')
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--read-only', action='store_true', help='Leave out the routes that write.')
+    parser.add_argument('--no-cache', action='store_true', help='Disable the page and fragment cache.')
+    parser.add_argument('--seed', nargs=3, type=int, metavar=('VENUES', 'ARTISTS', 'SHOWS'),
+                        help='Seed the database with synthetic rows first.')
+    parser.add_argument('--output', help='JSON file to write, default benchmarks/results/<commit>.json.')
+    parser.add_argument('--compare', help='JSON file of an earlier run.')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='Relative p50 slowdown that counts as a regression.')
+    args = parser.parse_args()
+
+    from src.app import create_app
+    from src.models import db, Artist, Show, Venue
+
+    overrides = {'WTF_CSRF_ENABLED': False}
+    if args.no_cache:
+        overrides['CACHE_BACKEND'] = 'null'
+    app = create_app(overrides=overrides)
+
+    routes = [r for r in ROUTES if (not args.endpoints or r.endpoint in args.endpoints)
+              and not (args.read_only and r.write)]
+    views = {name for name, fn in app.view_functions.items() if fn.__module__ == 'src.views'}
+    missing = views - {r.endpoint for r in ROUTES}
+    if missing:
+        print('not benchmarked: ' + ', '.join(sorted(missing)), file=sys.stderr)
+
+    queries = []
+
+    def count_query(*_):
+        queries.append(1)
+
+    with app.app_context():
+        if args.seed:
+            from benchmarks.seed import seed
+            seed(*args.seed)
+        for engine in db.engines.values():
+            event.listen(engine, 'before_cursor_execute', count_query)
+        deletes = 0 if args.read_only else args.iterations + args.warmup + 1
+        ids = sample_ids(db, Artist, Show, Venue, deletes)
+        volumes = {m.__tablename__: db.session.query(m.id).count() for m in (Venue, Artist, Show)}
+        dialect = db.engine.dialect.name
+        db.session.remove()
+
+    results = {
+        'commit': git_commit(),
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'database': dialect,
+        'rows': volumes,
+        'cache': not args.no_cache,
+        'routes': {},
+    }
+    client = app.test_client()
+    for route in routes:
+        results['routes'][route.endpoint] = stats = run_route(
+            client, route, ids, args.iterations, args.warmup, queries)
+        print('%-26s %-6s p50 %8.2f  p95 %8.2f  p99 %8.2f ms %8.1f req/s %4d queries %9.1f KB peak' % (
+            route.endpoint, route.method, stats['p50_ms'], stats['p95_ms'], stats['p99_ms'],
+            stats['requests_per_s'], stats['queries'], stats['peak_memory_kb']))
+
+    output = args.output or 'benchmarks/results/%s.json' % (results['commit'] or 'latest')
+    if os.path.dirname(output):
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print('results written to ' + output)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressed = compare(results, json.load(f), args.threshold)
+        if regressed:
+            sys.exit('p50 regressed by more than %d%%: %s' % (args.threshold * 100, ', '.join(regressed)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""Fills the configured database with synthetic venues, artists and shows.
+
+The same --random-seed always produces the same rows, so runs of the route
+benchmark on different commits see the same data.
+
+    python -m benchmarks.seed --venues 1000 --artists 2000 --shows 50000 [--drop]
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+WORDS = ['Blue', 'Red', 'Golden', 'Velvet', 'Electric', 'Silver', 'Midnight', 'Wild',
+         'Neon', 'Hidden', 'Lucky', 'Broken', 'Paper', 'Iron', 'Crystal', 'Lonely']
+NOUNS = ['Room', 'Hall', 'Garden', 'Tavern', 'Lounge', 'Cellar', 'Theatre', 'Club',
+         'Foxes', 'Tigers', 'Lights', 'Machines', 'Rivers', 'Ghosts', 'Hearts', 'Owls']
+CITIES = ['San Francisco', 'New York', 'Chicago', 'Austin', 'Seattle', 'Boston',
+          'Denver', 'Portland', 'Nashville', 'Atlanta', 'Detroit', 'Miami']
+
+
+def _choices(form_field):
+    return [value for value, _ in form_field.kwargs['choices']]
+
+
+def _entity(rng, i, states, genres, stamp):
+    return {
+        'name': '%s %s %d' % (rng.choice(WORDS), rng.choice(NOUNS), i),
+        'city': rng.choice(CITIES),
+        'state': rng.choice(states),
+        'phone': '%03d-%03d-%04d' % (rng.randint(200, 999), rng.randint(0, 999), rng.randint(0, 9999)),
+        'genres': rng.sample(genres, rng.randint(1, 3)),
+        'image_link': 'https://example.com/images/%d.jpg' % i,
+        'facebook_link': 'https://www.facebook.com/%d' % i,
+        'website': 'https://example.com/%d' % i,
+        'seeking_description': rng.choice([None, 'Looking for new talent']),
+        'updated_at': stamp,
+    }
+
+
+def seed(venues, artists, shows, random_seed=0, batch_size=5000, echo=print):
+    """Inserts the rows in batches of `batch_size`, next to any existing ones.
+    Shows are spread over a year before and a year after now."""
+    from src.cache import invalidate
+    from src.commands import write_batch
+    from src.forms import VenueForm
+    from src.models import db, utcnow, Artist, Show, Venue
+    from src.search import invalidate_indexes
+
+    rng = random.Random(random_seed)
+    states, genres = _choices(VenueForm.state), _choices(VenueForm.genres)
+    now, stamp = datetime.now(), utcnow()
+
+    def insert(model, count, make):
+        """Returns the ids of the new rows."""
+        start = time.perf_counter()
+        before = db.session.query(db.func.max(model.id)).scalar() or 0
+        for offset in range(0, count, batch_size):
+            # the import's writer: COPY on Postgres, genres into their own table
+            rows = [make(before + i + 1) for i in range(offset, min(offset + batch_size, count))]
+            write_batch(model, rows, use_copy=db.engine.dialect.name == 'postgresql')
+        echo('%-7s %8d rows in %.1fs' % (model.__tablename__, count, time.perf_counter() - start))
+        return [i for i, in db.session.query(model.id).filter(model.id > before).order_by(model.id)]
+
+    venue_ids = insert(Venue, venues, lambda i: dict(
+        _entity(rng, i, states, genres, stamp), address='%d %s St' % (rng.randint(1, 999), rng.choice(WORDS))))
+    artist_ids = insert(Artist, artists, lambda i: _entity(rng, i, states, genres, stamp))
+    insert(Show, shows, lambda i: {
+        'venue_id': rng.choice(venue_ids),
+        'artist_id': rng.choice(artist_ids),
+        'start_time': (now + timedelta(minutes=rng.randint(-525600, 525600))).replace(second=0, microsecond=0),
+        'updated_at': stamp,
+    })
+    invalidate('venues', 'artists', 'shows')
+    invalidate_indexes()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--venues', type=int, default=1000)
+    parser.add_argument('--artists', type=int, default=2000)
+    parser.add_argument('--shows', type=int, default=50000)
+    parser.add_argument('--random-seed', type=int, default=0)
+    parser.add_argument('--drop', action='store_true', help='Empty the tables first.')
+    args = parser.parse_args()
+
+    from src.app import create_app
+    from src.models import db, artist_genres, venue_genres, Artist, Show, ShowListing, Venue
+
+    app = create_app()
+
+    with app.app_context():
+        if args.drop:
+            for table in (ShowListing.__table__, venue_genres, artist_genres):
+                db.session.execute(table.delete())
+            for model in (Show, Artist, Venue):
+                db.session.query(model).delete()
+            db.session.commit()
+        seed(args.venues, args.artists, args.shows, args.random_seed)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+"""Startup time and per-worker memory of a prefork deployment.
+
+Startup: create_app() in fresh interpreters, --runs times, and
+the latency of the first request to --path after it.
+
+Memory: forks --workers processes the way a prefork server does, once from
+a master that already loaded the app (gunicorn --preload, through src.wsgi)
+and once from a bare master whose workers each load it themselves. Every
+worker serves --requests requests to --path, then reports its memory while
+all of them are still alive, so the proportional share (PSS) of the pages
+they have in common is meaningful:
+
+    rss  resident memory, shared pages counted in full
+    pss  shared pages divided among the processes sharing them
+    uss  pages private to the worker, what each extra worker costs
+
+Reads /proc/self/smaps_rollup, so the memory part needs Linux.
+
+    python -m benchmarks.startup --workers 4 --path /venues
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+STARTUP = '''
+import time
+start = time.perf_counter()
+from src.app import create_app
+app = create_app()
+loaded = time.perf_counter()
+response = app.test_client().get(%r)
+print(loaded - start, time.perf_counter() - loaded, response.status_code)
+'''
+
+
+def startup(path, runs):
+    imports, first_requests = [], []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, '-c', STARTUP % path], check=True,
+                             capture_output=True, text=True).stdout.split()
+        imports.append(float(out[0]) * 1000)
+        first_requests.append(float(out[1]) * 1000)
+        status = int(out[2])
+    return {
+        'import_ms': round(statistics.median(imports), 1),
+        'import_min_ms': round(min(imports), 1),
+        'first_request_ms': round(statistics.median(first_requests), 1),
+        'status': status,
+    }
+
+
+def memory() -> dict:
+    """kB of this process, from smaps_rollup."""
+    fields = {}
+    with open('/proc/self/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1])
+    return {
+        'rss': fields['Rss'],
+        'pss': fields['Pss'],
+        'uss': fields['Private_Clean'] + fields['Private_Dirty'],
+    }
+
+
+def worker(path, requests):
+    from src.app import create_app
+    client = create_app().test_client()
+    for _ in range(requests):
+        client.get(path).close()
+
+
+def forked_workers(workers, path, requests, preload):
+    """Memory of each worker, in kB, measured while all of them are alive."""
+    if preload:
+        import src.wsgi  # noqa: F401  the master loads the app before forking
+    children, results = [], []
+    release_read, release_write = os.pipe()
+    for _ in range(workers):
+        result_read, result_write = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(result_read)
+            os.close(release_write)
+            status = 0
+            try:
+                worker(path, requests)
+                os.write(result_write, json.dumps(memory()).encode())
+            except BaseException:
+                status = 1
+            finally:
+                os.close(result_write)
+                os.read(release_read, 1)  # stays alive until every worker reported
+                os._exit(status)
+        os.close(result_write)
+        children.append((pid, result_read))
+
+    for pid, result_read in children:
+        with os.fdopen(result_read) as f:
+            data = f.read()
+        if data:
+            results.append(json.loads(data))
+    os.close(release_write)
+    os.close(release_read)
+    for pid, _ in children:
+        os.waitpid(pid, 0)
+    return results
+
+
+def summary(results) -> dict:
+    return {key: round(statistics.mean(r[key] for r in results) / 1024, 1) for key in ('rss', 'pss', 'uss')}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--path', default='/', help='Route every worker requests.')
+    parser.add_argument('--runs', type=int, default=5, help='Interpreters started to time the startup.')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=20, help='Requests served by each worker before measuring.')
+    parser.add_argument('--output', help='JSON file to write the results to.')
+    args = parser.parse_args()
+
+    results = {'startup': startup(args.path, args.runs)}
+    print('create_app          %8.1f ms (min %.1f)' % (results['startup']['import_ms'], results['startup']['import_min_ms']))
+    print('first request %-5s %8.1f ms (status %d)' % (args.path, results['startup']['first_request_ms'],
+                                                       results['startup']['status']))
+
+    if os.path.exists('/proc/self/smaps_rollup'):
+        print('\n%-12s %8s %8s %8s   MiB per worker, %d workers' % ('master', 'rss', 'pss', 'uss', args.workers))
+        # without preload first: the preloading master keeps the app loaded
+        for mode, preload in (('no-preload', False), ('preload', True)):
+            workers = forked_workers(args.workers, args.path, args.requests, preload)
+            if len(workers) < args.workers:
+                sys.exit('%d of %d %s workers failed' % (args.workers - len(workers), args.workers, mode))
+            results[mode] = summary(workers)
+            print('%-12s %8.1f %8.1f %8.1f' % (mode, results[mode]['rss'], results[mode]['pss'], results[mode]['uss']))
+    else:
+        print('no /proc/self/smaps_rollup, memory left out', file=sys.stderr)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
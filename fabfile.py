@@ -6,8 +6,9 @@ from fabric.contrib.console import confirm
 
 def test():
     with settings(warn_only=True):
+        # every route once against the configured database; fails on any 5xx
         result = local(
-            "python test_tasks.py -v && python test_users.py -v", capture=True
+            "python -m benchmarks.routes --iterations 1 --warmup 0 --output /dev/null", capture=True
         )
     if result.failed and not confirm("Tests failed. Continue?"):
         abort("Aborted at user request.")
@@ -40,7 +41,7 @@ def heroku():
 
 def heroku_test():
     local(
-        "heroku run python test_tasks.py -v && heroku run python test_users.py -v"
+        "heroku run python -m benchmarks.routes --read-only --iterations 1 --warmup 0 --output /dev/null"
     )
 
 
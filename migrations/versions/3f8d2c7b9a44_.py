@@ -0,0 +1,28 @@
+"""updated_at version stamps on Venue, Artist and Show
+
+Revision ID: 3f8d2c7b9a44
+Revises: e9b27a4c6f10
+Create Date: 2026-10-18 13:25:52.690412
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f8d2c7b9a44'
+down_revision = 'e9b27a4c6f10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table in ('Venue', 'Artist', 'Show'):
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(), server_default=sa.func.now(), nullable=False))
+        op.create_index(f'ix_{table}_updated_at', table, ['updated_at'], unique=False)
+
+
+def downgrade():
+    for table in ('Show', 'Artist', 'Venue'):
+        op.drop_index(f'ix_{table}_updated_at', table_name=table)
+        op.drop_column(table, 'updated_at')
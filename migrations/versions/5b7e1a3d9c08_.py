@@ -0,0 +1,143 @@
+"""genres moved from ARRAY columns to a Genre table with association tables
+
+Revision ID: 5b7e1a3d9c08
+Revises: 3f8d2c7b9a44
+Create Date: 2026-10-18 15:02:14.318205
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b7e1a3d9c08'
+down_revision = '3f8d2c7b9a44'
+branch_labels = None
+depends_on = None
+
+# (entity table, association table, its column pointing at the entity)
+LINKS = (('Venue', 'VenueGenre', 'venue_id'), ('Artist', 'ArtistGenre', 'artist_id'))
+
+# Same weights as in 7a3c1d9e5b21, with the genres read from the association
+# table. The row trigger covers name, city and state; genre changes refresh
+# the vector from statement triggers on the association table.
+SEARCH_VECTOR = """
+    setweight(to_tsvector('simple', coalesce({row}.name, '')), 'A') ||
+    setweight(to_tsvector('simple', coalesce({row}.city, '') || ' ' || coalesce({row}.state, '')), 'B') ||
+    setweight(to_tsvector('simple', coalesce((
+        SELECT string_agg(g.name, ' ') FROM "{link}" l JOIN "Genre" g ON g.id = l.genre_id
+        WHERE l.{key} = {row}.id
+    ), '')), 'C')
+"""
+OLD_SEARCH_VECTOR = """
+    setweight(to_tsvector('simple', coalesce({row}.name, '')), 'A') ||
+    setweight(to_tsvector('simple', coalesce({row}.city, '') || ' ' || coalesce({row}.state, '')), 'B') ||
+    setweight(to_tsvector('simple', coalesce(array_to_string({row}.genres, ' '), '')), 'C')
+"""
+
+
+def upgrade():
+    op.create_table('Genre',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=120), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_Genre_name', 'Genre', ['name'], unique=True)
+    for table, link, key in LINKS:
+        op.create_table(link,
+        sa.Column(key, sa.Integer(), nullable=False),
+        sa.Column('genre_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint([key], [f'{table}.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['genre_id'], ['Genre.id'], ),
+        sa.PrimaryKeyConstraint(key, 'genre_id')
+        )
+        op.create_index(f'ix_{link}_genre_id_{key}', link, ['genre_id', key], unique=False)
+
+    if op.get_bind().dialect.name != 'postgresql':
+        for table, _, _ in LINKS:
+            with op.batch_alter_table(table) as batch_op:
+                batch_op.drop_column('genres')
+        return
+
+    op.execute('''
+        INSERT INTO "Genre" (name)
+        SELECT DISTINCT unnest(genres) FROM "Venue"
+        UNION SELECT DISTINCT unnest(genres) FROM "Artist"
+    ''')
+    for table, link, key in LINKS:
+        op.execute(f'''
+            INSERT INTO "{link}" ({key}, genre_id)
+            SELECT DISTINCT t.id, g.id FROM "{table}" t CROSS JOIN LATERAL unnest(t.genres) AS u(name)
+            JOIN "Genre" g ON g.name = u.name
+        ''')
+        op.execute(f'DROP TRIGGER "{table}_search_vector_trigger" ON "{table}"')
+        op.drop_column(table, 'genres')
+        op.execute(f'''
+            CREATE OR REPLACE FUNCTION "{table}_search_vector_update"() RETURNS trigger AS $$
+            BEGIN
+                NEW.search_vector := {SEARCH_VECTOR.format(row='NEW', link=link, key=key)};
+                RETURN NEW;
+            END
+            $$ LANGUAGE plpgsql
+        ''')
+        op.execute(f'''
+            CREATE TRIGGER "{table}_search_vector_trigger"
+            BEFORE INSERT OR UPDATE OF name, city, state ON "{table}"
+            FOR EACH ROW EXECUTE PROCEDURE "{table}_search_vector_update"()
+        ''')
+        # once per statement, so a bulk import updates each entity once
+        quoted = f'"{table}"'
+        op.execute(f'''
+            CREATE FUNCTION "{link}_search_vector_update"() RETURNS trigger AS $$
+            BEGIN
+                UPDATE {quoted} SET search_vector = {SEARCH_VECTOR.format(row=quoted, link=link, key=key)}
+                WHERE id IN (SELECT {key} FROM changed);
+                RETURN NULL;
+            END
+            $$ LANGUAGE plpgsql
+        ''')
+        for event, transition in (('INSERT', 'NEW'), ('DELETE', 'OLD')):
+            op.execute(f'''
+                CREATE TRIGGER "{link}_{event.lower()}_search_vector_trigger"
+                AFTER {event} ON "{link}" REFERENCING {transition} TABLE AS changed
+                FOR EACH STATEMENT EXECUTE PROCEDURE "{link}_search_vector_update"()
+            ''')
+        op.execute(f'UPDATE {quoted} SET search_vector = {SEARCH_VECTOR.format(row=quoted, link=link, key=key)}')
+
+
+def downgrade():
+    for table, _, _ in LINKS:
+        op.add_column(table, sa.Column('genres', sa.ARRAY(sa.String(length=120)), nullable=True))
+
+    if op.get_bind().dialect.name == 'postgresql':
+        for table, link, key in LINKS:
+            quoted = f'"{table}"'
+            op.execute(f'''
+                UPDATE {quoted} SET genres = (
+                    SELECT array_agg(g.name ORDER BY g.name) FROM "{link}" l JOIN "Genre" g ON g.id = l.genre_id
+                    WHERE l.{key} = {quoted}.id
+                )
+            ''')
+            for event in ('insert', 'delete'):
+                op.execute(f'DROP TRIGGER "{link}_{event}_search_vector_trigger" ON "{link}"')
+            op.execute(f'DROP FUNCTION "{link}_search_vector_update"()')
+            op.execute(f'DROP TRIGGER "{table}_search_vector_trigger" ON "{table}"')
+            op.execute(f'''
+                CREATE OR REPLACE FUNCTION "{table}_search_vector_update"() RETURNS trigger AS $$
+                BEGIN
+                    NEW.search_vector := {OLD_SEARCH_VECTOR.format(row='NEW')};
+                    RETURN NEW;
+                END
+                $$ LANGUAGE plpgsql
+            ''')
+            op.execute(f'''
+                CREATE TRIGGER "{table}_search_vector_trigger"
+                BEFORE INSERT OR UPDATE OF name, city, state, genres ON "{table}"
+                FOR EACH ROW EXECUTE PROCEDURE "{table}_search_vector_update"()
+            ''')
+
+    for _, link, key in LINKS:
+        op.drop_index(f'ix_{link}_genre_id_{key}', table_name=link)
+        op.drop_table(link)
+    op.drop_index('ix_Genre_name', table_name='Genre')
+    op.drop_table('Genre')
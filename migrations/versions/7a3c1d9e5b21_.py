@@ -0,0 +1,65 @@
+"""full-text and trigram search on venues and artists
+
+Revision ID: 7a3c1d9e5b21
+Revises: 2e51e4f87e77
+Create Date: 2026-10-18 10:12:31.402117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '7a3c1d9e5b21'
+down_revision = '2e51e4f87e77'
+branch_labels = None
+depends_on = None
+
+TABLES = ('Venue', 'Artist')
+
+# array_to_string() is not immutable, so the vector can be neither a generated
+# column nor an expression index; a trigger keeps it up to date instead.
+SEARCH_VECTOR = """
+    setweight(to_tsvector('simple', coalesce({row}.name, '')), 'A') ||
+    setweight(to_tsvector('simple', coalesce({row}.city, '') || ' ' || coalesce({row}.state, '')), 'B') ||
+    setweight(to_tsvector('simple', coalesce(array_to_string({row}.genres, ' '), '')), 'C')
+"""
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for table in TABLES:
+        op.add_column(table, sa.Column('search_vector', postgresql.TSVECTOR(), nullable=True))
+        op.execute(f'''
+            CREATE FUNCTION "{table}_search_vector_update"() RETURNS trigger AS $$
+            BEGIN
+                NEW.search_vector := {SEARCH_VECTOR.format(row='NEW')};
+                RETURN NEW;
+            END
+            $$ LANGUAGE plpgsql
+        ''')
+        op.execute(f'''
+            CREATE TRIGGER "{table}_search_vector_trigger"
+            BEFORE INSERT OR UPDATE OF name, city, state, genres ON "{table}"
+            FOR EACH ROW EXECUTE PROCEDURE "{table}_search_vector_update"()
+        ''')
+        quoted = f'"{table}"'
+        op.execute(f'UPDATE {quoted} SET search_vector = {SEARCH_VECTOR.format(row=quoted)}')
+        op.create_index(f'ix_{table}_search_vector', table, ['search_vector'], postgresql_using='gin')
+        op.execute(f'CREATE INDEX "ix_{table}_name_trgm" ON "{table}" USING gin (name gin_trgm_ops)')
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    for table in TABLES:
+        op.execute(f'DROP INDEX "ix_{table}_name_trgm"')
+        op.drop_index(f'ix_{table}_search_vector', table_name=table)
+        op.execute(f'DROP TRIGGER "{table}_search_vector_trigger" ON "{table}"')
+        op.execute(f'DROP FUNCTION "{table}_search_vector_update"()')
+        op.drop_column(table, 'search_vector')
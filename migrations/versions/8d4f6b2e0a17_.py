@@ -0,0 +1,56 @@
+"""ShowArchive: cold storage for past shows, partitioned by month on Postgres
+
+Revision ID: 8d4f6b2e0a17
+Revises: 5b7e1a3d9c08
+Create Date: 2026-10-18 16:40:03.551879
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d4f6b2e0a17'
+down_revision = '5b7e1a3d9c08'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        # the partition key has to be part of the primary key; the monthly
+        # partitions are created by `flask archive-shows` as it needs them
+        op.execute('''
+            CREATE TABLE "ShowArchive" (
+                id integer NOT NULL,
+                artist_id integer NOT NULL REFERENCES "Artist" (id) ON DELETE CASCADE,
+                venue_id integer NOT NULL REFERENCES "Venue" (id) ON DELETE CASCADE,
+                start_time timestamp without time zone NOT NULL,
+                updated_at timestamp without time zone NOT NULL,
+                PRIMARY KEY (id, start_time)
+            ) PARTITION BY RANGE (start_time)
+        ''')
+    else:
+        op.create_table('ShowArchive',
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('artist_id', sa.Integer(), nullable=False),
+        sa.Column('venue_id', sa.Integer(), nullable=False),
+        sa.Column('start_time', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['artist_id'], ['Artist.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['venue_id'], ['Venue.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+        )
+    op.create_index('ix_ShowArchive_venue_id_start_time', 'ShowArchive', ['venue_id', 'start_time'], unique=False)
+    op.create_index('ix_ShowArchive_artist_id_start_time', 'ShowArchive', ['artist_id', 'start_time'], unique=False)
+
+
+def downgrade():
+    # archived shows go back to the hot table first
+    op.execute('''
+        INSERT INTO "Show" (id, artist_id, venue_id, start_time, updated_at)
+        SELECT id, artist_id, venue_id, start_time, updated_at FROM "ShowArchive"
+    ''')
+    op.drop_index('ix_ShowArchive_artist_id_start_time', table_name='ShowArchive')
+    op.drop_index('ix_ShowArchive_venue_id_start_time', table_name='ShowArchive')
+    op.drop_table('ShowArchive')
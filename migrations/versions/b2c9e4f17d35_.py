@@ -0,0 +1,47 @@
+"""ShowListing read model of the hot shows
+
+Revision ID: b2c9e4f17d35
+Revises: 8d4f6b2e0a17
+Create Date: 2026-10-18 17:55:40.206631
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b2c9e4f17d35'
+down_revision = '8d4f6b2e0a17'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('ShowListing',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('start_time', sa.DateTime(), nullable=False),
+    sa.Column('artist_id', sa.Integer(), nullable=False),
+    sa.Column('artist_name', sa.String(), nullable=True),
+    sa.Column('artist_image_link', sa.String(length=500), nullable=True),
+    sa.Column('venue_id', sa.Integer(), nullable=False),
+    sa.Column('venue_name', sa.String(), nullable=True),
+    sa.Column('venue_image_link', sa.String(length=500), nullable=True),
+    sa.ForeignKeyConstraint(['id'], ['Show.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_ShowListing_start_time_id', 'ShowListing', ['start_time', 'id'], unique=False)
+    op.create_index('ix_ShowListing_venue_id_start_time', 'ShowListing', ['venue_id', 'start_time'], unique=False)
+    op.create_index('ix_ShowListing_artist_id_start_time', 'ShowListing', ['artist_id', 'start_time'], unique=False)
+    op.execute('''
+        INSERT INTO "ShowListing"
+            (id, start_time, artist_id, artist_name, artist_image_link, venue_id, venue_name, venue_image_link)
+        SELECT s.id, s.start_time, s.artist_id, a.name, a.image_link, s.venue_id, v.name, v.image_link
+        FROM "Show" s JOIN "Artist" a ON a.id = s.artist_id JOIN "Venue" v ON v.id = s.venue_id
+    ''')
+
+
+def downgrade():
+    op.drop_index('ix_ShowListing_artist_id_start_time', table_name='ShowListing')
+    op.drop_index('ix_ShowListing_venue_id_start_time', table_name='ShowListing')
+    op.drop_index('ix_ShowListing_start_time_id', table_name='ShowListing')
+    op.drop_table('ShowListing')
@@ -0,0 +1,26 @@
+"""composite (venue_id, start_time) and (artist_id, start_time) indexes on Show
+
+Revision ID: c41f0b8e2d6a
+Revises: 7a3c1d9e5b21
+Create Date: 2026-10-18 11:02:47.551083
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c41f0b8e2d6a'
+down_revision = '7a3c1d9e5b21'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_Show_venue_id_start_time', 'Show', ['venue_id', 'start_time'], unique=False)
+    op.create_index('ix_Show_artist_id_start_time', 'Show', ['artist_id', 'start_time'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_Show_artist_id_start_time', table_name='Show')
+    op.drop_index('ix_Show_venue_id_start_time', table_name='Show')
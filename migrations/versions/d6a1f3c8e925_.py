@@ -0,0 +1,41 @@
+"""Job queue table
+
+Revision ID: d6a1f3c8e925
+Revises: b2c9e4f17d35
+Create Date: 2026-10-18 19:12:07.548213
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd6a1f3c8e925'
+down_revision = 'b2c9e4f17d35'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('Job',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=120), nullable=False),
+    sa.Column('key', sa.String(length=255), nullable=True),
+    sa.Column('payload', sa.Text(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('run_at', sa.DateTime(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('locked_at', sa.DateTime(), nullable=True),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_Job_status_run_at', 'Job', ['status', 'run_at'], unique=False)
+    op.create_index('ix_Job_name_key_queued', 'Job', ['name', 'key'], unique=True,
+                    postgresql_where=sa.text("status = 'queued'"), sqlite_where=sa.text("status = 'queued'"))
+
+
+def downgrade():
+    op.drop_index('ix_Job_name_key_queued', table_name='Job')
+    op.drop_index('ix_Job_status_run_at', table_name='Job')
+    op.drop_table('Job')
@@ -0,0 +1,24 @@
+"""(state, city, name) index on Venue for the area listing
+
+Revision ID: e9b27a4c6f10
+Revises: c41f0b8e2d6a
+Create Date: 2026-10-18 11:40:09.218364
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e9b27a4c6f10'
+down_revision = 'c41f0b8e2d6a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_Venue_state_city_name', 'Venue', ['state', 'city', 'name'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_Venue_state_city_name', table_name='Venue')
@@ -0,0 +1,35 @@
+"""Venue and Artist name, city and state not null
+
+Revision ID: f3a8c5d1b046
+Revises: d6a1f3c8e925
+Create Date: 2026-10-18 21:40:13.208547
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3a8c5d1b046'
+down_revision = 'd6a1f3c8e925'
+branch_labels = None
+depends_on = None
+
+COLUMNS = (('name', sa.String()), ('city', sa.String(length=120)), ('state', sa.String(length=120)))
+
+
+def upgrade():
+    # keyset pagination compares these as row values, which never match a NULL
+    for table in ('Venue', 'Artist'):
+        for column, type_ in COLUMNS:
+            op.execute(sa.text(f'UPDATE "{table}" SET {column} = \'\' WHERE {column} IS NULL'))
+        with op.batch_alter_table(table) as batch_op:
+            for column, type_ in COLUMNS:
+                batch_op.alter_column(column, existing_type=type_, nullable=False)
+
+
+def downgrade():
+    for table in ('Artist', 'Venue'):
+        with op.batch_alter_table(table) as batch_op:
+            for column, type_ in COLUMNS:
+                batch_op.alter_column(column, existing_type=type_, nullable=True)
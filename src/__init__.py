@@ -1,3 +1,3 @@
-from src.app import app
-from src.models import *
-from src.views import *
+# The app is set up by create_app(), called by the entry points (src.wsgi,
+# src.asgi, `flask` with FLASK_APP=src), not on import.
+from src.app import create_app  # noqa: F401
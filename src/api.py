@@ -0,0 +1,162 @@
+import json
+from datetime import datetime
+
+from flask import abort, request, stream_with_context
+
+from src.app import app
+from src.models import db, Artist, ShowListing, Venue
+from src.export import EXPORTS, encode, gzipped
+from src.genres import genres_by_id
+from src.pagination import keyset_page, page_size
+from src.queries import SHOW_LISTING_COLUMNS, show_listing
+from src.search import search
+
+try:
+    import orjson
+except ImportError:  # optional, the stdlib encoder is only slower
+    orjson = None
+
+
+#  Read-only JSON API
+#  ----------------------------------------------------------------
+#  Rows are fetched as column tuples, never as models, and ?fields= narrows
+#  the SELECT itself, not just the output. `genres` is not a column: it is
+#  read from the genre tables afterwards, in one query for the whole page.
+
+VENUE_FIELDS = {c.key: c for c in (
+    Venue.id, Venue.name, Venue.city, Venue.state, Venue.address, Venue.phone,
+    Venue.image_link, Venue.facebook_link, Venue.website, Venue.seeking_description,
+)}
+VENUE_FIELDS['genres'] = Venue.genres
+ARTIST_FIELDS = {c.key: c for c in (
+    Artist.id, Artist.name, Artist.city, Artist.state, Artist.phone,
+    Artist.image_link, Artist.facebook_link, Artist.website, Artist.seeking_description,
+)}
+ARTIST_FIELDS['genres'] = Artist.genres
+SHOW_FIELDS = {c.key: c for c in SHOW_LISTING_COLUMNS}
+
+
+def _default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(type(value))
+
+
+def json_response(payload, status=200):
+    if orjson is not None:
+        body = orjson.dumps(payload, default=_default)
+    else:
+        body = json.dumps(payload, default=_default, separators=(',', ':'))
+    return app.response_class(body, status=status, mimetype='application/json')
+
+
+def api_abort(status, message):
+    abort(json_response({'error': message}, status))
+
+
+def selected_fields(available: dict) -> list:
+    fields = request.args.get('fields')
+    if not fields:
+        return list(available)
+    fields = fields.split(',')
+    unknown = set(fields) - set(available)
+    if unknown:
+        api_abort(400, 'unknown fields: ' + ', '.join(sorted(unknown)))
+    return fields
+
+
+def to_dicts(rows, fields, columns, ids) -> list:
+    genres = {}
+    if 'genres' in fields:
+        genres = genres_by_id(columns['genres'].owning_class, ids)
+    return [{f: genres.get(i, []) if f == 'genres' else getattr(row, f) for f in fields}
+            for row, i in zip(rows, ids)]
+
+
+def list_response(columns: dict, key, base=None):
+    """Pages through `columns` by the sort `key`, with ?fields= / ?after= / ?before=."""
+    fields = selected_fields(columns)
+    selected = [columns[f] for f in fields if f != 'genres']
+    # the sort key is always selected, the cursors are made from it
+    selected += [c for c in key if not any(c is s for s in selected)]
+    query = base.with_entities(*selected) if base is not None else db.session.query(*selected)
+    try:
+        page = keyset_page(query, key)
+    except ValueError:
+        api_abort(400, 'invalid cursor')
+    return json_response({
+        'data': to_dicts(page.items, fields, columns, [row.id for row in page.items]),
+        'next': page.next_cursor,
+        'prev': page.prev_cursor,
+    })
+
+
+def item_response(columns: dict, model, entity_id):
+    fields = selected_fields(columns)
+    # id keeps the SELECT non-empty when only genres are asked for
+    row = db.session.query(model.id, *[columns[f] for f in fields if f != 'genres']) \
+        .filter(model.id == entity_id).first()
+    if row is None:
+        api_abort(404, 'not found')
+    return json_response({'data': to_dicts([row], fields, columns, [entity_id])[0]})
+
+
+@app.route('/api/v1/venues')
+def api_venues():
+    return list_response(VENUE_FIELDS, (Venue.id,))
+
+
+@app.route('/api/v1/venues/<int:venue_id>')
+def api_venue(venue_id):
+    return item_response(VENUE_FIELDS, Venue, venue_id)
+
+
+@app.route('/api/v1/artists')
+def api_artists():
+    return list_response(ARTIST_FIELDS, (Artist.id,))
+
+
+@app.route('/api/v1/artists/<int:artist_id>')
+def api_artist(artist_id):
+    return item_response(ARTIST_FIELDS, Artist, artist_id)
+
+
+@app.route('/api/v1/shows')
+def api_shows():
+    # ?venue_id= / ?artist_id= narrow the list, ?upcoming=1 drops past shows
+    shows = show_listing()
+    if request.args.get('venue_id', type=int):
+        shows = shows.filter(ShowListing.venue_id == request.args.get('venue_id', type=int))
+    if request.args.get('artist_id', type=int):
+        shows = shows.filter(ShowListing.artist_id == request.args.get('artist_id', type=int))
+    if request.args.get('upcoming') == '1':
+        shows = shows.filter(ShowListing.start_time > datetime.now())
+    return list_response(SHOW_FIELDS, (ShowListing.start_time, ShowListing.id), base=shows)
+
+
+@app.route('/api/v1/search/<kind>')
+def api_search(kind):
+    model = {'venues': Venue, 'artists': Artist}.get(kind)
+    if model is None:
+        api_abort(404, 'not found')
+    hits = search(model, request.args.get('q', ''), limit=page_size())
+    return json_response({'data': [hit._asdict() for hit in hits]})
+
+
+@app.route('/api/v1/export/<kind>')
+def api_export(kind):
+    # ?format=csv|ndjson, ?gzip=1 compresses the stream on the fly
+    if kind not in EXPORTS:
+        api_abort(404, 'not found')
+    fmt = request.args.get('format', 'csv')
+    if fmt not in ('csv', 'ndjson'):
+        api_abort(400, 'unknown format: ' + fmt)
+
+    chunks = encode(kind, fmt)
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    filename = '%s.%s' % (kind, fmt)
+    if request.args.get('gzip') == '1':
+        chunks = gzipped(chunks)
+        mimetype, filename = 'application/gzip', filename + '.gz'
+    return app.response_class(stream_with_context(chunks), mimetype=mimetype,
+                              headers={'Content-Disposition': 'attachment; filename=' + filename})
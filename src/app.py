@@ -1,41 +1,82 @@
 import logging
+import os
 from logging import Formatter, FileHandler
 
-import dateutil.parser
-import babel
 from flask import Flask
 from flask_moment import Moment
 
+from src.assets import init_assets
+from src.cache import init_cache
+from src.compression import init_compression
+from src.dates import make_filter
+
 # App Config.
 
 app = Flask(__name__)
-moment = Moment(app)
-app.config.from_object('config')
-
-def format_datetime(value, format='medium'):
-    date = dateutil.parser.parse(value)
-    if format == 'full':
-        format = "EEEE MMMM, d, y 'at' h:mma"
-    elif format == 'medium':
-        format = "EE MM, dd, y h:mma"
-    return babel.dates.format_datetime(date, format)
-
+moment = Moment()
 
-app.jinja_env.filters['datetime'] = format_datetime
 
-if not app.debug:
-    file_handler = FileHandler('../error.log')
+def init_logging(app):
+    # delay: the file is opened on the first record, by the process that
+    # writes it, rather than at import time in a master that forks
+    if app.debug or not app.config.get('ERROR_LOG'):
+        return
+    file_handler = FileHandler(app.config['ERROR_LOG'], delay=True)
     file_handler.setFormatter(
         Formatter('%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]')
     )
     app.logger.setLevel(logging.INFO)
     file_handler.setLevel(logging.INFO)
     app.logger.addHandler(file_handler)
-    app.logger.info('errors')
+
+
+def create_app(config='config', overrides=None):
+    """Sets up `app`: configuration, extensions, models, views, API and CLI
+    commands, from the config object or module `config` and then the
+    mapping `overrides`.
+
+    There is one app per process, the one the views register on: calling
+    this again with the same arguments returns it as it is, with others it
+    raises. Entry points call it (src.wsgi, src.asgi, `flask` with
+    FLASK_APP=src); importing `src` does not. With a prefork server, call it
+    in the master before forking so the workers share the loaded modules;
+    no database connection is opened here, and the engines drop any
+    inherited connection in each forked child.
+    """
+    settings = (config, sorted((overrides or {}).items()))
+    if 'fyyur' in app.extensions:
+        if app.extensions['fyyur'] != settings:
+            raise RuntimeError('the app is already set up with another configuration')
+        return app
+    app.config.from_object(config)
+    app.config.update(overrides or {})
+    if not app.config.get('SECRET_KEY'):
+        if not app.debug:
+            raise RuntimeError('SECRET_KEY is not set')
+        # sessions then only survive within one process
+        app.config['SECRET_KEY'] = os.urandom(32)
+        app.logger.warning('SECRET_KEY is not set, using a random key')
+
+    moment.init_app(app)
+    init_cache(app)
+    init_assets(app)
+    init_compression(app)
+    app.jinja_env.filters['datetime'] = make_filter(app)
+    init_logging(app)
+
+    # these register their models, routes and commands on `app` as they are imported
+    from src.models import init_db
+    init_db(app)
+    import src.views  # noqa: F401
+    import src.api  # noqa: F401
+    import src.commands  # noqa: F401
+    app.extensions['fyyur'] = settings
+    return app
+
 
 # Launch
 if __name__ == '__main__':
-    app.run()
+    create_app().run()
 
 # Or specify port manually:
 '''
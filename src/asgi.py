@@ -0,0 +1,161 @@
+"""ASGI serving mode.
+
+    uvicorn src.asgi:application --workers 4
+
+The read endpoints listed in ASYNC_ENDPOINTS (home, lists, detail pages,
+search) run on the event loop against an async driver: the unchanged Flask
+view executes inside AsyncSession.run_sync(), so each of its queries yields
+the loop to other requests instead of blocking the worker. Every other
+request goes to the regular WSGI app in a thread.
+
+Needs asgiref, greenlet and an async driver (asyncpg for Postgres). Bodies of
+async requests are buffered, STREAM_LIST_PAGES only applies to WSGI workers.
+"""
+import io
+import random
+import sys
+import time
+
+from asgiref.wsgi import WsgiToAsgi
+from flask import request
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from werkzeug.exceptions import HTTPException
+
+from src.app import app, create_app
+from src.models import db
+
+
+def async_uri(uri: str) -> str:
+    for scheme in ('postgres://', 'postgresql://', 'postgresql+psycopg2://'):
+        if uri.startswith(scheme):
+            return 'postgresql+asyncpg://' + uri[len(scheme):]
+    return uri
+
+
+def async_database_uri(config) -> str:
+    return config.get('SQLALCHEMY_ASYNC_DATABASE_URI') or async_uri(config['SQLALCHEMY_DATABASE_URI'])
+
+
+def build_environ(scope, body: bytes) -> dict:
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf8').decode('latin1'),
+        'PATH_INFO': scope['path'].encode('utf8').decode('latin1'),
+        'QUERY_STRING': scope['query_string'].decode('ascii'),
+        'SERVER_NAME': (scope.get('server') or ('localhost', 80))[0],
+        'SERVER_PORT': str((scope.get('server') or ('localhost', 80))[1]),
+        'SERVER_PROTOCOL': 'HTTP/%s' % scope['http_version'],
+        'REMOTE_ADDR': (scope.get('client') or ('', 0))[0],
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin1').upper().replace('-', '_')
+        value = value.decode('latin1')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = 'HTTP_' + name
+        environ[name] = environ[name] + ',' + value if name in environ else value
+    return environ
+
+
+@app.before_request
+def use_async_session():
+    # requests coming through AsyncApp run their queries on its session
+    session = request.environ.get('fyyur.db_session')
+    if session is not None:
+        db.session.registry.set(session)
+
+
+class AsyncApp:
+    def __init__(self, flask_app):
+        self.app = flask_app
+        self.fallback = WsgiToAsgi(flask_app)
+        self.endpoints = set(flask_app.config.get('ASYNC_ENDPOINTS', ()))
+        self.urls = flask_app.url_map.bind('localhost')
+        self.engine = None
+        self.replicas = []
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        if scope['type'] != 'http' or not self.is_async(scope):
+            return await self.fallback(scope, receive, send)
+
+        body = b''
+        while True:
+            message = await receive()
+            body += message.get('body', b'')
+            if not message.get('more_body'):
+                break
+
+        if self.engine is None:
+            self.start()
+        environ = build_environ(scope, body)
+        async with AsyncSession(self.choose_engine(environ)) as session:
+            status, headers, chunks = await session.run_sync(self.run_wsgi, environ)
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': b''.join(chunks)})
+
+    def is_async(self, scope) -> bool:
+        try:
+            endpoint, _ = self.urls.match(scope['path'], method=scope['method'])
+        except HTTPException:
+            return False
+        return endpoint in self.endpoints
+
+    def choose_engine(self, environ):
+        """A replica for GET/HEAD, unless the client wrote within
+        READ_YOUR_WRITES_SECONDS; the primary otherwise, as RoutingSession
+        chooses for WSGI requests."""
+        if not self.replicas or environ['REQUEST_METHOD'] not in ('GET', 'HEAD'):
+            return self.engine
+        session = self.app.session_interface.open_session(self.app, self.app.request_class(environ))
+        window = self.app.config.get('READ_YOUR_WRITES_SECONDS', 5)
+        if session is not None and time.time() - session.get('_last_write', 0) < window:
+            return self.engine
+        return random.choice(self.replicas)
+
+    def run_wsgi(self, session, environ):
+        # runs in a greenlet: blocking on the database here awaits the driver
+        environ['fyyur.db_session'] = session
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response['status'] = int(status.split(' ', 1)[0])
+            response['headers'] = [(k.lower().encode('latin1'), v.encode('latin1')) for k, v in headers]
+
+        body = self.app.wsgi_app(environ, start_response)
+        try:
+            chunks = list(body)
+        finally:
+            if hasattr(body, 'close'):
+                body.close()
+        return response['status'], response['headers'], chunks
+
+    def start(self):
+        # engines are made in the worker process, never inherited over fork
+        pool_size = self.app.config.get('ASYNC_POOL_SIZE', 20)
+        self.engine = create_async_engine(async_database_uri(self.app.config), pool_size=pool_size)
+        self.replicas = [create_async_engine(async_uri(uri), pool_size=pool_size)
+                         for uri in self.app.config.get('SQLALCHEMY_REPLICA_URIS') or []]
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                self.start()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                for engine in [self.engine, *self.replicas]:
+                    if engine is not None:
+                        await engine.dispose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+application = AsyncApp(create_app())
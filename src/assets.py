@@ -0,0 +1,162 @@
+import gzip
+import hashlib
+import json
+import os
+import re
+
+from flask import abort, current_app, request, send_from_directory
+
+try:
+    import brotli
+except ImportError:  # optional, bundles are then only precompressed with gzip
+    brotli = None
+
+try:
+    import rcssmin
+except ImportError:  # optional, falls back to the conservative minifier below
+    rcssmin = None
+
+try:
+    import rjsmin
+except ImportError:  # optional, unminified scripts are then bundled as they are
+    rjsmin = None
+
+# bundle name -> source files under static/, in page order
+BUNDLES = {
+    'app.css': [
+        'css/bootstrap.min.css',
+        'css/layout.main.css',
+        'css/main.css',
+        'css/main.responsive.css',
+        'css/main.quickfix.css',
+    ],
+    'head.js': [
+        'js/libs/modernizr-2.8.2.min.js',
+        'js/libs/moment.min.js',
+    ],
+    # deferred, after jQuery
+    'app.js': [
+        'js/script.js',
+        'js/libs/bootstrap-3.1.1.min.js',
+        'js/plugins.js',
+    ],
+}
+
+DIST = 'dist'
+MANIFEST = 'manifest.json'
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+MIMETYPES = {'.css': 'text/css', '.js': 'text/javascript'}
+
+
+#  Static asset bundles
+#  ----------------------------------------------------------------
+#  `flask build-assets` concatenates and minifies each bundle into
+#  static/dist/<name>.<content hash>.<ext>, next to .gz and .br copies, and
+#  records the names in static/dist/manifest.json. A new build never
+#  overwrites a name, so the files are served as immutable; pages pick up
+#  a new build through the manifest. Without a manifest (or with
+#  ASSET_BUNDLES off) pages keep linking the source files.
+
+def minify_css(text):
+    if rcssmin is not None:
+        return rcssmin.cssmin(text)
+    text = re.sub(r'/\*.*?\*/', '', text, flags=re.S)
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'\s*([{};,>])\s*', r'\1', text)
+    return text.replace(';}', '}').strip()
+
+
+def minify_js(text, path):
+    text = re.sub(r'^//[#@] sourceMappingURL=.*$', '', text, flags=re.M)
+    if rjsmin is not None and not path.endswith('.min.js'):
+        text = rjsmin.jsmin(text)
+    return text.strip()
+
+
+def bundle_content(name, static_folder) -> bytes:
+    parts = []
+    for path in BUNDLES[name]:
+        with open(os.path.join(static_folder, path), encoding='utf-8') as f:
+            text = f.read()
+        parts.append(minify_css(text) if name.endswith('.css') else minify_js(text, path))
+    # `;` guards against sources that leave their last statement open
+    return ('\n' if name.endswith('.css') else ';\n').join(parts).encode()
+
+
+def build(static_folder) -> dict:
+    """Writes every bundle and its compressed copies, then the manifest.
+    Returns the manifest: bundle name -> file name under static/dist."""
+    dist = os.path.join(static_folder, DIST)
+    os.makedirs(dist, exist_ok=True)
+    manifest = {}
+    for name in BUNDLES:
+        content = bundle_content(name, static_folder)
+        stem, ext = os.path.splitext(name)
+        filename = '%s.%s%s' % (stem, hashlib.sha256(content).hexdigest()[:12], ext)
+        variants = {'': content, '.gz': gzip.compress(content, 9, mtime=0)}
+        if brotli is not None:
+            variants['.br'] = brotli.compress(content, quality=11)
+        for suffix, data in variants.items():
+            with open(os.path.join(dist, filename + suffix), 'wb') as f:
+                f.write(data)
+        manifest[name] = filename
+
+    with open(os.path.join(dist, MANIFEST + '.tmp'), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    # swapped in whole, so a running app never reads half a manifest
+    os.replace(os.path.join(dist, MANIFEST + '.tmp'), os.path.join(dist, MANIFEST))
+    return manifest
+
+
+def load_manifest(app):
+    path = os.path.join(app.static_folder, DIST, MANIFEST)
+    if not app.config.get('ASSET_BUNDLES', True) or not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def asset_urls(name):
+    """The URLs a page links for bundle `name`: the bundle once built,
+    its source files otherwise."""
+    manifest = current_app.extensions['assets']
+    static = current_app.static_url_path
+    if manifest and name in manifest:
+        return ['%s/%s/%s' % (static, DIST, manifest[name])]
+    return ['%s/%s' % (static, path) for path in BUNDLES[name]]
+
+
+def asset_version() -> str:
+    """Changes with every build, for caches of pages that link the bundles."""
+    return current_app.extensions['assets_version']
+
+
+def send_bundle(filename):
+    """Serves a built bundle, precompressed when the client takes it."""
+    ext = os.path.splitext(filename)[1]
+    if '/' in filename or ext not in MIMETYPES:
+        abort(404)
+    dist = os.path.join(current_app.static_folder, DIST)
+    encoding, suffix = None, ''
+    for name, candidate in ENCODINGS:
+        if request.accept_encodings[name] and os.path.exists(os.path.join(dist, filename + candidate)):
+            encoding, suffix = name, candidate
+            break
+
+    response = send_from_directory(dist, filename + suffix, mimetype=MIMETYPES[ext],
+                                   max_age=current_app.config.get('ASSET_MAX_AGE', 31536000))
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    # the name changes with the content, so it can be kept for good
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+def init_assets(app):
+    manifest = load_manifest(app)
+    app.extensions['assets'] = manifest
+    app.extensions['assets_version'] = hashlib.sha256(json.dumps(manifest, sort_keys=True).encode()).hexdigest()[:12]
+    app.jinja_env.globals['asset_urls'] = asset_urls
+    app.add_url_rule('%s/%s/<path:filename>' % (app.static_url_path, DIST), 'bundle', send_bundle)
@@ -0,0 +1,82 @@
+from collections import Counter, namedtuple
+from datetime import datetime, timedelta
+
+from sqlalchemy import literal, or_, tuple_
+
+from src.listing import refresh_shows
+from src.models import db, utcnow, Artist, Show, Venue
+
+# `line` says where the date came from in the form, for error messages
+TourDate = namedtuple('TourDate', 'line venue_id start_time')
+
+
+#  Batch show creation
+#  ----------------------------------------------------------------
+#  A tour is checked as a whole, with a fixed number of queries however many
+#  dates it has, and booked in one transaction or not at all.
+
+def parse_dates(text: str):
+    """Reads "venue_id, YYYY-MM-DD HH:MM" lines. Returns (dates, errors)."""
+    dates, errors = [], []
+    for n, line in enumerate(text.splitlines(), start=1):
+        if not line.strip():
+            continue
+        label = 'line %d' % n
+        venue_id, _, start_time = line.partition(',')
+        try:
+            dates.append(TourDate(label, int(venue_id), datetime.fromisoformat(start_time.strip())))
+        except ValueError:
+            errors.append((label, 'expected "venue_id, YYYY-MM-DD HH:MM", got "%s"' % line.strip()))
+    return dates, errors
+
+
+def recurring_dates(venue_id, start: datetime, every_days: int, count: int) -> list:
+    return [TourDate('repeat %d' % (i + 1), venue_id, start + timedelta(days=every_days * i))
+            for i in range(count)]
+
+
+def check_tour(artist_id: int, dates) -> list:
+    """Per-date errors: unknown artist or venue, the same slot twice in the
+    tour, or a slot the artist or the venue is already booked for."""
+    venue_ids = {d.venue_id for d in dates}
+    # the artist and every venue in a single round trip
+    known = {tuple(row) for row in db.session.query(literal('artist'), Artist.id).filter(Artist.id == artist_id)
+             .union_all(db.session.query(literal('venue'), Venue.id).filter(Venue.id.in_(venue_ids)))}
+    if ('artist', artist_id) not in known:
+        return [('artist', 'no artist with id %s' % artist_id)]
+
+    times = {d.start_time for d in dates}
+    booked = db.session.query(Show.artist_id, Show.venue_id, Show.start_time).filter(or_(
+        (Show.artist_id == artist_id) & Show.start_time.in_(times),
+        tuple_(Show.venue_id, Show.start_time).in_([(d.venue_id, d.start_time) for d in dates]),
+    )).all()
+    artist_busy = {start for a, _, start in booked if a == artist_id}
+    venue_busy = {(v, start) for _, v, start in booked}
+    repeated = Counter(d.start_time for d in dates)
+
+    errors = []
+    for d in dates:
+        if ('venue', d.venue_id) not in known:
+            errors.append((d.line, 'no venue with id %d' % d.venue_id))
+        elif repeated[d.start_time] > 1:
+            errors.append((d.line, 'listed more than once for %s' % d.start_time))
+        elif d.start_time in artist_busy:
+            errors.append((d.line, 'the artist already has a show at %s' % d.start_time))
+        elif (d.venue_id, d.start_time) in venue_busy:
+            errors.append((d.line, 'venue %d is already booked at %s' % (d.venue_id, d.start_time)))
+    return errors
+
+
+def book_tour(artist_id: int, dates):
+    """Inserts every date as a Show in one multi-row INSERT and one commit."""
+    now = utcnow()
+    table = Show.__table__
+    connection = db.session.connection()
+    # values([...]) rather than executemany, which is one INSERT per row
+    # wherever the driver cannot batch RETURNING (SQLite)
+    ids = connection.execute(table.insert().values([
+        {'artist_id': artist_id, 'venue_id': d.venue_id, 'start_time': d.start_time, 'updated_at': now}
+        for d in dates
+    ]).returning(table.c.id)).scalars().all()
+    refresh_shows(connection, ids)
+    db.session.commit()
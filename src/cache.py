@@ -0,0 +1,188 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, make_response, request, session
+
+from src.assets import asset_version
+from src.compression import accepted_encoding
+
+
+class MemoryCache:
+    """LRU cache with per-entry TTL, local to one process."""
+
+    def __init__(self, max_entries=1000, default_ttl=300):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.entries = OrderedDict()
+        self.tags = {}
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires is not None and expires < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.default_ttl if ttl is None else ttl
+        with self.lock:
+            self.entries[key] = (value, time.monotonic() + ttl if ttl else None)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def versions(self, tags):
+        return [self.tags.get(tag, 0) for tag in tags]
+
+    def bump(self, tag):
+        with self.lock:
+            self.tags[tag] = self.tags.get(tag, 0) + 1
+
+
+class RedisCache:
+    """Cache shared by every worker process through one Redis server.
+
+    Eviction is left to Redis, run it with `maxmemory-policy allkeys-lru`.
+    """
+
+    def __init__(self, url, default_ttl=300, prefix='fyyur:'):
+        import redis  # optional dependency, only needed for this backend
+        self.client = redis.Redis.from_url(url)
+        self.default_ttl = default_ttl
+        self.prefix = prefix
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        return None if value is None else pickle.loads(value)
+
+    def set(self, key, value, ttl=None):
+        ttl = self.default_ttl if ttl is None else ttl
+        self.client.set(self.prefix + key, pickle.dumps(value), ex=ttl or None)
+
+    def versions(self, tags):
+        values = self.client.mget([self.prefix + 'tag:' + tag for tag in tags])
+        return [int(v or 0) for v in values]
+
+    def bump(self, tag):
+        self.client.incr(self.prefix + 'tag:' + tag)
+
+
+class NullCache:
+    def get(self, key):
+        return None
+
+    def set(self, key, value, ttl=None):
+        pass
+
+    def versions(self, tags):
+        return [0] * len(tags)
+
+    def bump(self, tag):
+        pass
+
+
+def init_cache(app):
+    backend = app.config.get('CACHE_BACKEND', 'memory')
+    ttl = app.config.get('CACHE_DEFAULT_TTL', 300)
+    if backend == 'memory':
+        cache = MemoryCache(app.config.get('CACHE_MAX_ENTRIES', 1000), ttl)
+    elif backend == 'redis':
+        cache = RedisCache(app.config['CACHE_REDIS_URL'], ttl)
+    else:
+        cache = NullCache()
+    app.extensions['cache'] = cache
+
+
+def get_cache():
+    return current_app.extensions['cache']
+
+
+def _tag_versions(cache, tags) -> str:
+    return ','.join('%s=%d' % tv for tv in zip(tags, cache.versions(tags)))
+
+
+def invalidate(*tags):
+    """Drops every page and fragment cached under any of `tags`.
+
+    Nothing is deleted: the tag's version is bumped, so keys built from the old
+    version are never read again and age out through TTL/LRU.
+    """
+    cache = get_cache()
+    for tag in tags:
+        cache.bump(tag)
+
+
+def cached_fragment(name, tags, compute, ttl=None):
+    cache = get_cache()
+    key = 'fragment:%s|%s' % (name, _tag_versions(cache, tags))
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.set(key, value, ttl)
+    return value
+
+
+def _store_when_done(chunks, cache, key, ttl):
+    # passes a streamed body through and caches it once it was sent completely
+    body = []
+    for chunk in chunks:
+        body.append(chunk.encode() if isinstance(chunk, str) else chunk)
+        yield chunk
+    cache.set(key, b''.join(body), ttl)
+
+
+def cached_page(*tags, ttl=None):
+    """Caches the rendered body of a GET view per full path (with query string).
+
+    Requests with pending flash messages bypass the cache, the layout renders
+    them into the page.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method != 'GET' or session.get('_flashes'):
+                return view(*args, **kwargs)
+
+            cache = get_cache()
+            key = 'page:%s|%s|%s' % (request.full_path, asset_version(), _tag_versions(cache, tags))
+            encoding = accepted_encoding()
+            if encoding is not None:
+                body = cache.get('%s|%s' % (key, encoding))
+                if body is not None:
+                    response = current_app.response_class(body, mimetype='text/html')
+                    response.headers['Content-Encoding'] = encoding
+                    response.headers['X-Cache'] = 'HIT'
+                    return response
+
+            def keep_compressed(encoding, body):
+                # handed over by the compression hook, see src.compression
+                cache.set('%s|%s' % (key, encoding), body, ttl)
+
+            body = cache.get(key)
+            if body is not None:
+                response = current_app.response_class(body, mimetype='text/html')
+                response.headers['X-Cache'] = 'HIT'
+                response.keep_compressed = keep_compressed
+                return response
+
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                pass
+            elif response.is_streamed:
+                response.response = _store_when_done(response.response, cache, key, ttl)
+            else:
+                cache.set(key, response.get_data(), ttl)
+                response.keep_compressed = keep_compressed
+            response.headers['X-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return decorator
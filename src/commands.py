@@ -0,0 +1,339 @@
+import csv
+import gzip
+import io
+import json
+import os
+import time
+from datetime import datetime, timedelta
+
+import click
+from sqlalchemy import func, select, text
+from werkzeug.datastructures import MultiDict
+from wtforms import DateTimeField
+
+from src.app import app
+from src.assets import build
+from src.cache import invalidate
+from src.export import EXPORTS, encode, gzipped
+from src.forms import ArtistForm, ShowForm, VenueForm
+from src.genres import GENRE_LINKS, link_genres
+from src.jobs import Worker, queue_stats, retry_failed
+from src.listing import forget_shows, rebuild_listing, refresh_shows
+from src.models import db, utcnow, Artist, Show, ShowArchive, ShowListing, Venue
+from src.search import invalidate_indexes
+
+IMPORTS = {
+    'venues': (Venue, VenueForm),
+    'artists': (Artist, ArtistForm),
+    'shows': (Show, ShowForm),
+}
+
+
+#  Bulk import
+#  ----------------------------------------------------------------
+
+def _open(path):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8', newline='')
+    return open(path, encoding='utf-8', newline='')
+
+
+def read_rows(f, fmt):
+    if fmt == 'ndjson':
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+    else:
+        for row in csv.DictReader(f):
+            # multi-valued columns (genres) are written as "Jazz|Blues" in CSV
+            yield {k: v.split('|') if k == 'genres' else v for k, v in row.items()}
+
+
+def to_formdata(row) -> MultiDict:
+    items = []
+    for key, value in row.items():
+        if isinstance(value, list):
+            items.extend((key, str(v)) for v in value)
+        elif value is not None:
+            items.append((key, str(value)))
+    return MultiDict(items)
+
+
+def validate(form_class, row, columns):
+    """Runs `row` through the same form the web handlers use, except that
+    required fields must be in the row rather than fall back to their form
+    default, and datetimes may also be ISO 8601.
+
+    Returns (values, None) or (None, errors).
+    """
+    form = form_class(formdata=to_formdata(row), meta={'csrf': False})
+    for field in form:
+        if isinstance(field, DateTimeField) and field.raw_data and field.data is None:
+            # ISO 8601 as well, e.g. "2026-10-18T04:56:24.635867"
+            try:
+                field.data = datetime.fromisoformat(field.raw_data[0].strip())
+                field.process_errors = []
+            except ValueError:
+                pass
+    valid = form.validate()
+    errors = dict(form.errors)
+    for field in form:
+        # a missing column would otherwise leave the field at its default
+        if field.flags.required and not field.raw_data and field.name not in errors:
+            errors[field.name] = ['This field is required.']
+    if not valid or errors:
+        return None, errors
+    values = {f.name: f.data for f in form if f.name in columns}
+    for ref in ('artist', 'venue'):
+        # shows may point at artists / venues by name instead of id
+        if ref in row and not values.get(ref + '_id'):
+            values[ref] = row[ref]
+    return values, None
+
+
+def resolve_references(rows):
+    """Turns artist/venue names into ids and checks the ids exist, one query
+    per referenced table for the whole batch. Returns (rows, errors)."""
+    errors = []
+    for ref, model in (('artist', Artist), ('venue', Venue)):
+        names = {r[ref] for _, r in rows if ref in r}
+        by_name = {}
+        if names:
+            for id_, name in db.session.query(model.id, model.name).filter(model.name.in_(names)):
+                by_name[name] = id_ if name not in by_name else None  # None marks an ambiguous name
+        for _, r in rows:
+            if ref in r:
+                r[ref + '_id'] = by_name.get(r.pop(ref))
+
+        ids = {int(r[ref + '_id']) for _, r in rows if str(r.get(ref + '_id') or '').isdigit()}
+        known = {i for i, in db.session.query(model.id).filter(model.id.in_(ids))} if ids else set()
+        kept = []
+        for line, r in rows:
+            value = str(r.get(ref + '_id') or '')
+            if value.isdigit() and int(value) in known:
+                r[ref + '_id'] = int(value)
+                kept.append((line, r))
+            else:
+                errors.append((line, {ref: ['unknown or ambiguous %s' % ref]}))
+        rows = kept
+    return rows, errors
+
+
+def _copy_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def write_batch(model, rows, use_copy):
+    if not rows:
+        return
+    table = model.__table__
+    connection = db.session.connection()
+    # genres go to the association table and shows to the listing read model,
+    # both need the ids of the new rows
+    genres = [r.pop('genres', None) or [] for r in rows] if model in GENRE_LINKS else None
+    cursor = None
+    if use_copy:
+        fairy = connection.connection
+        cursor = getattr(fairy, 'dbapi_connection', fairy).cursor()
+    if cursor is not None and hasattr(cursor, 'copy_expert'):
+        # psycopg2: COPY is the fastest way into Postgres. It returns no ids,
+        # so they are taken from the sequence up front.
+        ids = connection.execute(
+            text("SELECT nextval(pg_get_serial_sequence(:table, 'id')) FROM generate_series(1, :n)"),
+            {'table': '"%s"' % table.name, 'n': len(rows)}).scalars().all()
+        for r, id_ in zip(rows, ids):
+            r['id'] = id_
+        columns = list(rows[0])
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        for r in rows:
+            writer.writerow([_copy_value(r.get(c)) for c in columns])
+        buf.seek(0)
+        names = ', '.join('"%s"' % c for c in columns)
+        cursor.copy_expert(f'COPY "{table.name}" ({names}) FROM STDIN WITH (FORMAT csv)', buf)
+    else:
+        # executemany, which SQLAlchemy sends as multi-row INSERTs where the driver allows
+        ids = connection.execute(table.insert().returning(table.c.id, sort_by_parameter_order=True),
+                                 rows).scalars().all()
+    if genres is not None:
+        link_genres(model, dict(zip(ids, genres)))
+    if model is Show:
+        refresh_shows(connection, ids)
+    db.session.commit()
+
+
+@app.cli.command('import')
+@click.argument('kind', type=click.Choice(list(IMPORTS)))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'ndjson']),
+              help='Input format, guessed from the file name by default.')
+@click.option('--batch-size', default=5000, show_default=True)
+@click.option('--copy/--no-copy', 'use_copy', default=True, show_default=True,
+              help='Use COPY when the database is Postgres.')
+def import_command(kind, path, fmt, batch_size, use_copy):
+    """Bulk loads venues, artists or shows from a CSV or NDJSON file (optionally .gz)."""
+    model, form_class = IMPORTS[kind]
+    table = model.__table__
+    columns = {c.name for c in table.columns} | ({'genres'} if model in GENRE_LINKS else set())
+    use_copy = use_copy and db.engine.dialect.name == 'postgresql'
+    fmt = fmt or ('ndjson' if '.ndjson' in path or '.jsonl' in path else 'csv')
+
+    start = time.perf_counter()
+    written = rejected = 0
+
+    def flush(batch):
+        nonlocal written, rejected
+        if not batch:
+            return
+        if kind == 'shows':
+            batch, errors = resolve_references(batch)
+            for line, error in errors:
+                click.echo('line %d: %s' % (line, error), err=True)
+            rejected += len(errors)
+        now = utcnow()
+        write_batch(model, [dict(r, updated_at=now) for _, r in batch], use_copy)
+        written += len(batch)
+        elapsed = time.perf_counter() - start
+        click.echo('%d rows written, %d rejected, %.0f rows/s' % (written, rejected, written / elapsed))
+
+    with _open(path) as f:
+        batch = []
+        for line, row in enumerate(read_rows(f, fmt), start=1):
+            values, errors = validate(form_class, row, columns)
+            if errors:
+                click.echo('line %d: %s' % (line, errors), err=True)
+                rejected += 1
+                continue
+            batch.append((line, values))
+            if len(batch) >= batch_size:
+                flush(batch)
+                batch = []
+        flush(batch)
+        invalidate('venues', 'artists', 'shows')
+        invalidate_indexes()
+
+    elapsed = time.perf_counter() - start
+    click.echo('done: %d %s in %.1fs (%.0f rows/s), %d rejected'
+               % (written, kind, elapsed, written / elapsed if elapsed else 0, rejected))
+
+
+#  Bulk export
+#  ----------------------------------------------------------------
+
+@app.cli.command('export')
+@click.argument('kind', type=click.Choice(list(EXPORTS)))
+@click.argument('output', type=click.File('wb'), default='-')
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'ndjson']), default='csv', show_default=True)
+@click.option('--gzip', 'compress', is_flag=True, help='Compress the output on the fly.')
+@click.option('--batch-size', default=5000, show_default=True)
+def export_command(kind, output, fmt, compress, batch_size):
+    """Streams every venue, artist or show to OUTPUT (stdout by default)."""
+    chunks = encode(kind, fmt, batch_size)
+    chunks = gzipped(chunks) if compress else (c.encode() for c in chunks)
+    start = time.perf_counter()
+    size = 0
+    for chunk in chunks:
+        output.write(chunk)
+        size += len(chunk)
+    click.echo('%s: %d bytes in %.1fs' % (kind, size, time.perf_counter() - start), err=True)
+
+
+#  Archival
+#  ----------------------------------------------------------------
+#  Past shows move from Show to ShowArchive, so the hot table only holds the
+#  last SHOW_ARCHIVE_HORIZON_DAYS and whatever is upcoming.
+
+def create_archive_partitions(start, end):
+    """Creates the monthly partitions of ShowArchive covering [start, end]."""
+    month = start.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    while month <= end:
+        following = (month + timedelta(days=32)).replace(day=1)
+        db.session.execute(text(
+            f'CREATE TABLE IF NOT EXISTS "ShowArchive_{month:%Y_%m}" PARTITION OF "ShowArchive" '
+            f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{following:%Y-%m-%d}')"
+        ))
+        month = following
+    db.session.commit()
+
+
+@app.cli.command('archive-shows')
+@click.option('--horizon-days', type=int, help='Default: SHOW_ARCHIVE_HORIZON_DAYS.')
+@click.option('--batch-size', type=int, help='Default: SHOW_ARCHIVE_BATCH_SIZE.')
+def archive_shows_command(horizon_days, batch_size):
+    """Moves the shows that started more than HORIZON_DAYS ago to ShowArchive."""
+    if horizon_days is None:
+        horizon_days = app.config.get('SHOW_ARCHIVE_HORIZON_DAYS', 365)
+    batch_size = batch_size or app.config.get('SHOW_ARCHIVE_BATCH_SIZE', 5000)
+    cutoff = datetime.now() - timedelta(days=horizon_days)
+
+    oldest = db.session.query(func.min(Show.start_time)).filter(Show.start_time < cutoff).scalar()
+    if oldest is None:
+        click.echo('nothing to archive before %s' % cutoff.date())
+        return
+    if db.engine.dialect.name == 'postgresql':
+        create_archive_partitions(oldest, cutoff)
+
+    start = time.perf_counter()
+    columns = [c.name for c in ShowArchive.__table__.columns]
+    moved = 0
+    while True:
+        # oldest first, each batch in its own transaction
+        ids = [i for i, in db.session.query(Show.id).filter(Show.start_time < cutoff)
+               .order_by(Show.start_time, Show.id).limit(batch_size)]
+        if not ids:
+            break
+        db.session.execute(ShowArchive.__table__.insert().from_select(
+            columns, select(*[Show.__table__.c[c] for c in columns]).where(Show.id.in_(ids))))
+        forget_shows(db.session.connection(), ids)
+        db.session.execute(Show.__table__.delete().where(Show.id.in_(ids)))
+        db.session.commit()
+        moved += len(ids)
+        click.echo('%d shows archived' % moved)
+    invalidate('shows')
+
+    click.echo('done: %d shows before %s archived in %.1fs' % (moved, cutoff.date(), time.perf_counter() - start))
+
+
+@app.cli.command('rebuild-listing')
+def rebuild_listing_command():
+    """Rebuilds the ShowListing read model from Show, Artist and Venue."""
+    start = time.perf_counter()
+    rebuild_listing()
+    click.echo('%d shows listed in %.1fs' % (db.session.query(ShowListing).count(), time.perf_counter() - start))
+
+
+#  Static assets
+#  ----------------------------------------------------------------
+
+@app.cli.command('build-assets')
+def build_assets_command():
+    """Builds the minified, fingerprinted and precompressed bundles."""
+    dist = os.path.join(app.static_folder, 'dist')
+    for name, filename in build(app.static_folder).items():
+        sizes = ' '.join('%s %d' % (suffix or 'raw', os.path.getsize(os.path.join(dist, filename + suffix)))
+                         for suffix in ('', '.gz', '.br') if os.path.exists(os.path.join(dist, filename + suffix)))
+        click.echo('%-8s -> dist/%s (%s bytes)' % (name, filename, sizes))
+
+
+#  Background jobs
+#  ----------------------------------------------------------------
+
+@app.cli.command('worker')
+@click.option('--threads', default=4, show_default=True)
+@click.option('--once', is_flag=True, help='Exit when no job is due instead of waiting for more.')
+def worker_command(threads, once):
+    """Runs queued background jobs (JOBS_ASYNC), logging queue metrics every
+    JOB_METRICS_SECONDS."""
+    report = Worker(threads, once).run()
+    click.echo(json.dumps(report))
+
+
+@app.cli.command('jobs')
+@click.option('--retry-failed', 'retry', is_flag=True, help='Queue the failed jobs again.')
+def jobs_command(retry):
+    """Prints the depth and lag of the job queue."""
+    if retry:
+        click.echo('%d failed jobs queued again' % retry_failed())
+    click.echo(json.dumps(queue_stats()))
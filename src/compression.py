@@ -0,0 +1,142 @@
+import json
+import threading
+import time
+import zlib
+
+from flask import current_app, request
+
+try:
+    import brotli
+except ImportError:  # optional, responses are then only gzipped
+    brotli = None
+
+
+#  Response compression
+#  ----------------------------------------------------------------
+#  Rendered pages and API responses are compressed with brotli or gzip,
+#  whichever the client prefers among those available. Small bodies, other
+#  media types and bodies that already carry a Content-Encoding (the static
+#  bundles, ?gzip=1 exports) are left alone. Streamed bodies are compressed
+#  chunk by chunk with a sync flush, so they keep streaming.
+#  A view can set `response.keep_compressed(encoding, body)` to be handed
+#  the compressed body, which cached_page uses to compress a page once per
+#  encoding rather than on every hit.
+
+class CompressionStats:
+    """Totals of this process, logged every COMPRESSION_REPORT_EVERY responses."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.totals = {}
+
+    def record(self, encoding, size, compressed_size, cpu_seconds):
+        with self.lock:
+            count, raw, out, cpu = self.totals.get(encoding, (0, 0, 0, 0.0))
+            self.totals[encoding] = (count + 1, raw + size, out + compressed_size, cpu + cpu_seconds)
+            return sum(t[0] for t in self.totals.values())
+
+    def report(self) -> dict:
+        with self.lock:
+            return {
+                encoding: {
+                    'responses': count,
+                    'bytes_in': raw,
+                    'bytes_out': out,
+                    'ratio': round(out / raw, 3) if raw else None,
+                    'cpu_ms': round(cpu * 1000, 2),
+                }
+                for encoding, (count, raw, out, cpu) in self.totals.items()
+            }
+
+
+def accepted_encoding():
+    """The encoding to compress this request's response with, or None."""
+    if not current_app.config.get('COMPRESSION', True):
+        return None
+    offered = ['br', 'gzip'] if brotli is not None else ['gzip']
+    return request.accept_encodings.best_match(offered)
+
+
+def _compressor(encoding, config):
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=config.get('COMPRESSION_BROTLI_QUALITY', 5))
+        return compressor.process, compressor.flush, compressor.finish
+    compressor = zlib.compressobj(config.get('COMPRESSION_GZIP_LEVEL', 6), zlib.DEFLATED, 31)  # 31: gzip container
+    return compressor.compress, lambda: compressor.flush(zlib.Z_SYNC_FLUSH), compressor.flush
+
+
+def compress(encoding, body, config):
+    process, _, finish = _compressor(encoding, config)
+    return process(body) + finish()
+
+
+def _compressed_stream(app, chunks, encoding):
+    process, flush, finish = _compressor(encoding, app.config)
+    size = compressed_size = 0
+    cpu = 0.0
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            start = time.thread_time()
+            data = process(chunk) + flush()
+            cpu += time.thread_time() - start
+            size += len(chunk)
+            compressed_size += len(data)
+            if data:
+                yield data
+        start = time.thread_time()
+        data = finish()
+        cpu += time.thread_time() - start
+        compressed_size += len(data)
+        yield data
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+    _record(app, encoding, size, compressed_size, cpu)
+
+
+def _record(app, encoding, size, compressed_size, cpu):
+    stats = app.extensions['compression']
+    count = stats.record(encoding, size, compressed_size, cpu)
+    if count % app.config.get('COMPRESSION_REPORT_EVERY', 1000) == 0:
+        app.logger.info(json.dumps({'event': 'compression', **stats.report()}))
+
+
+def init_compression(app):
+    app.extensions['compression'] = CompressionStats()
+    mimetypes = set(app.config.get('COMPRESSION_MIMETYPES', ['text/html', 'application/json']))
+    min_size = app.config.get('COMPRESSION_MIN_SIZE', 1024)
+
+    @app.after_request
+    def compress_response(response):
+        if response.mimetype not in mimetypes or response.direct_passthrough:
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = accepted_encoding()
+        if (encoding is None or response.status_code != 200
+                or 'Content-Encoding' in response.headers or request.method == 'HEAD'):
+            return response
+
+        if response.is_streamed:
+            response.response = _compressed_stream(app, response.response, encoding)
+            response.headers.pop('Content-Length', None)
+            response.headers['Content-Encoding'] = encoding
+            return response
+
+        body = response.get_data()
+        if len(body) < min_size:
+            return response
+        start = time.thread_time()
+        compressed = compress(encoding, body, app.config)
+        cpu = time.thread_time() - start
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        _record(app, encoding, len(body), len(compressed), cpu)
+        keep = getattr(response, 'keep_compressed', None)
+        if keep is not None:
+            keep(encoding, compressed)
+        if app.debug:
+            response.headers['X-Compression-Ratio'] = '%.3f' % (len(compressed) / len(body))
+            response.headers['X-Compression-Ms'] = '%.2f' % (cpu * 1000)
+        return response
@@ -0,0 +1,108 @@
+import hashlib
+import time
+from datetime import datetime, timezone
+from functools import wraps
+
+from flask import current_app, make_response, request, session
+from sqlalchemy import case, func
+
+from src.assets import asset_version
+from src.models import db, Artist, Show, Venue
+
+
+def collection_stamp(*models):
+    """(max updated_at, row count) of each model, read in one SELECT.
+
+    The count is there for deletes, which leave no updated_at behind.
+    """
+    columns = []
+    for model in models:
+        columns.append(db.session.query(func.max(model.updated_at)).scalar_subquery())
+        columns.append(db.session.query(func.count(model.id)).scalar_subquery())
+    return tuple(db.session.query(*columns).one())
+
+
+def entity_stamp(model, key, other, other_key, entity_id):
+    """Version of a venue or artist page: the entity, its shows and the other
+    side of those shows, whose names and images the page also shows.
+
+    Returns None if there is no such entity.
+    """
+    now = datetime.now()
+    return db.session.query(
+        model.updated_at,
+        func.max(Show.updated_at),
+        func.max(other.updated_at),
+        func.count(Show.id),
+        # a show moving from upcoming to past changes the page too
+        func.count(case((Show.start_time > now, 1))),
+    ).outerjoin(Show, key == model.id) \
+        .outerjoin(other, other_key == other.id) \
+        .filter(model.id == entity_id) \
+        .group_by(model.id, model.updated_at) \
+        .first()
+
+
+def venue_stamp(venue_id):
+    return entity_stamp(Venue, Show.venue_id, Artist, Show.artist_id, venue_id)
+
+
+def artist_stamp(artist_id):
+    return entity_stamp(Artist, Show.artist_id, Venue, Show.venue_id, artist_id)
+
+
+def time_bucket() -> datetime:
+    # for pages whose content depends on the clock, e.g. upcoming show counts
+    bucket = current_app.config.get('CONDITIONAL_GET_TIME_BUCKET', 60)
+    return datetime.fromtimestamp(time.time() // bucket * bucket, timezone.utc).replace(tzinfo=None)
+
+
+def _last_modified(stamp):
+    # updated_at and time_bucket() are naive UTC
+    stamps = [s for s in stamp if isinstance(s, datetime)]
+    if not stamps:
+        return None
+    return max(stamps).replace(microsecond=0, tzinfo=timezone.utc)
+
+
+def conditional(get_stamp):
+    """Answers GET requests with 304 Not Modified when the version stamp of the
+    page still matches the client's ETag / Last-Modified, without running the
+    view. `get_stamp` gets the view arguments and returns a tuple.
+
+    The ETag covers the whole stamp and is what browsers revalidate with;
+    Last-Modified only follows the timestamps in it, so on its own it misses
+    deletes. Requests with pending flash messages are always rendered.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method != 'GET' or session.get('_flashes'):
+                return view(*args, **kwargs)
+
+            stamp = get_stamp(*args, **kwargs)
+            if stamp is None:
+                return view(*args, **kwargs)
+            etag = hashlib.sha1(repr((request.full_path, asset_version(), tuple(stamp))).encode()).hexdigest()
+            last_modified = _last_modified(stamp)
+
+            if request.if_none_match:
+                not_modified = request.if_none_match.contains_weak(etag)
+            else:
+                not_modified = bool(last_modified and request.if_modified_since
+                                    and last_modified <= request.if_modified_since)
+            if not_modified:
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            # weak: the same page goes out as gzip, brotli or plain (src.compression)
+            response.set_etag(etag, weak=True)
+            if last_modified:
+                response.last_modified = last_modified
+            response.cache_control.no_cache = True
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,60 @@
+from datetime import datetime
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+
+from babel import Locale
+from babel.dates import parse_pattern
+
+PATTERNS = {
+    'full': "EEEE MMMM, d, y 'at' h:mma",
+    'medium': "EE MM, dd, y h:mma",
+}
+
+
+@lru_cache(maxsize=64)
+def compiled_pattern(format: str, locale: str):
+    # parsing the pattern and loading the locale data is most of babel's cost,
+    # and both only depend on (format, locale)
+    return parse_pattern(PATTERNS.get(format, format)), Locale.parse(locale)
+
+
+@lru_cache(maxsize=16)
+def _zone(name: str):
+    return ZoneInfo(name)
+
+
+def format_datetime(value, format='medium', locale='en_US', tz=None, stored_tz='UTC'):
+    """Formats a datetime (or an ISO string of one) with a babel pattern.
+
+    Naive datetimes are taken to be in `stored_tz`; with `tz` they are
+    converted to that zone before formatting.
+    """
+    if value is None:
+        return ''
+    if isinstance(value, str):
+        value = _parse(value)
+    if tz:
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=_zone(stored_tz))
+        value = value.astimezone(_zone(tz))
+
+    pattern, locale = compiled_pattern(format, locale)
+    return pattern.apply(value, locale)
+
+
+def _parse(value: str) -> datetime:
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        import dateutil.parser  # only needed for strings that are not ISO 8601
+        return dateutil.parser.parse(value)
+
+
+def make_filter(app):
+    locale = app.config.get('BABEL_DEFAULT_LOCALE', 'en_US')
+    tz = app.config.get('DISPLAY_TIMEZONE')
+    stored_tz = app.config.get('STORAGE_TIMEZONE', 'UTC')
+
+    def datetime_filter(value, format='medium'):
+        return format_datetime(value, format, locale, tz, stored_tz)
+    return datetime_filter
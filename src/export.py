@@ -0,0 +1,91 @@
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+
+from sqlalchemy import select
+
+from src.genres import GENRE_LINKS, genres_by_id
+from src.models import db, Artist, Show, ShowArchive, Venue
+
+# what ShowForm.start_time reads, so an export loads back with `flask import`
+DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+EXPORTS = {
+    'venues': Venue,
+    'artists': Artist,
+    'shows': Show,
+    'archived-shows': ShowArchive,
+}
+
+
+#  Bulk export
+#  ----------------------------------------------------------------
+#  Rows come from a server-side cursor in batches of `batch_size` and are
+#  encoded batch by batch, so memory does not grow with the table.
+#  Venues and artists get their genres appended, one query per batch.
+
+def export_columns(kind):
+    return [c for c in EXPORTS[kind].__table__.columns if c.key != 'search_vector']
+
+
+def export_names(kind):
+    names = [c.key for c in export_columns(kind)]
+    if EXPORTS[kind] in GENRE_LINKS:
+        names.append('genres')
+    return names
+
+
+def export_rows(kind, batch_size=5000):
+    model = EXPORTS[kind]
+    result = db.session.execute(
+        select(*export_columns(kind)).order_by(model.id),
+        execution_options={'stream_results': True, 'yield_per': batch_size},
+    )
+    for batch in result.partitions():
+        if model not in GENRE_LINKS:
+            yield from batch
+            continue
+        genres = genres_by_id(model, [row.id for row in batch])
+        for row in batch:
+            yield tuple(row) + (genres.get(row.id, []),)
+
+
+def _value(value, fmt):
+    if isinstance(value, datetime):
+        return value.strftime(DATETIME_FORMAT)
+    if isinstance(value, list) and fmt == 'csv':
+        # same convention as `flask import`
+        return '|'.join(value)
+    return value
+
+
+def encode(kind, fmt='csv', batch_size=5000):
+    """Yields the export of `kind` as text chunks of about `batch_size` rows."""
+    names = export_names(kind)
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    if fmt == 'csv':
+        writer.writerow(names)
+
+    for n, row in enumerate(export_rows(kind, batch_size), start=1):
+        if fmt == 'csv':
+            writer.writerow([_value(v, fmt) for v in row])
+        else:
+            buf.write(json.dumps(dict(zip(names, (_value(v, fmt) for v in row)))))
+            buf.write('\n')
+        if n % batch_size == 0:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue()
+
+
+def gzipped(chunks, level=6):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # 31: gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode())
+        if data:
+            yield data
+    yield compressor.flush()
@@ -1,7 +1,7 @@
 from datetime import datetime
 from flask_wtf import Form, FlaskForm
-from wtforms import StringField, SelectField, SelectMultipleField, DateTimeField
-from wtforms.validators import DataRequired, AnyOf, URL
+from wtforms import StringField, SelectField, SelectMultipleField, DateTimeField, IntegerField, TextAreaField
+from wtforms.validators import DataRequired, AnyOf, URL, NumberRange, Optional
 
 class ShowForm(FlaskForm):
     artist_id = StringField(
@@ -16,6 +16,29 @@ class ShowForm(FlaskForm):
         default=datetime.today()
     )
 
+class TourForm(FlaskForm):
+    artist_id = StringField(
+        'artist_id', validators=[DataRequired()]
+    )
+    # one show per line: "venue_id, YYYY-MM-DD HH:MM"
+    dates = TextAreaField(
+        'dates'
+    )
+    # and / or a recurring date, e.g. a weekly residency
+    repeat_venue_id = StringField(
+        'repeat_venue_id'
+    )
+    repeat_start = DateTimeField(
+        'repeat_start', validators=[Optional()], format='%Y-%m-%d %H:%M'
+    )
+    repeat_every_days = IntegerField(
+        'repeat_every_days', validators=[Optional(), NumberRange(min=1, max=3660)], default=7
+    )
+    repeat_count = IntegerField(
+        # the view holds tours to TOUR_MAX_SHOWS as well
+        'repeat_count', validators=[Optional(), NumberRange(min=1, max=1000)]
+    )
+
 class VenueForm(FlaskForm):
     name = StringField(
         'name', validators=[DataRequired()]
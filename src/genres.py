@@ -0,0 +1,47 @@
+from collections import defaultdict
+
+from src.models import db, artist_genres, venue_genres, Artist, Genre, Venue
+
+# association table and its column pointing at the model
+GENRE_LINKS = {
+    Venue: (venue_genres, venue_genres.c.venue_id),
+    Artist: (artist_genres, artist_genres.c.artist_id),
+}
+
+
+def genre_ids(names) -> dict:
+    """Maps each genre name to its id, inserting the names not seen before."""
+    names = set(names)
+    if not names:
+        return {}
+    ids = dict(db.session.query(Genre.name, Genre.id).filter(Genre.name.in_(names)))
+    missing = names - set(ids)
+    if missing:
+        db.session.execute(Genre.__table__.insert(), [{'name': n} for n in sorted(missing)])
+        ids.update(db.session.query(Genre.name, Genre.id).filter(Genre.name.in_(missing)))
+    return ids
+
+
+def link_genres(model, genres_by_entity: dict):
+    """Bulk version of `entity.genres = [...]` for new rows, for writes that
+    bypass the ORM. `genres_by_entity` maps entity ids to lists of names."""
+    table, key = GENRE_LINKS[model]
+    ids = genre_ids(name for names in genres_by_entity.values() for name in names)
+    rows = [{key.name: entity_id, 'genre_id': ids[name]}
+            for entity_id, names in genres_by_entity.items() for name in set(names)]
+    if rows:
+        db.session.execute(table.insert(), rows)
+
+
+def genres_by_id(model, ids=None) -> dict:
+    """Maps entity ids to their sorted genre names, for all rows if `ids` is None."""
+    table, key = GENRE_LINKS[model]
+    query = db.session.query(key, Genre.name).join(Genre, Genre.id == table.c.genre_id)
+    if ids is not None:
+        if not ids:
+            return {}
+        query = query.filter(key.in_(ids))
+    genres = defaultdict(list)
+    for entity_id, name in query.order_by(key, Genre.name):
+        genres[entity_id].append(name)
+    return genres
@@ -0,0 +1,72 @@
+import json
+import time
+from collections import defaultdict
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+
+def init_instrumentation(app, db):
+    """Records every statement the engines run during a request.
+
+    In debug mode the summary goes to X-DB-* response headers, otherwise it is
+    written to the app log as one JSON line per request. Statements slower
+    than SQL_SLOW_QUERY_MS are logged on their own as well.
+    """
+    slow_ms = app.config.get('SQL_SLOW_QUERY_MS', 100)
+    n_plus_one = app.config.get('SQL_N_PLUS_ONE_THRESHOLD', 3)
+    top = app.config.get('SQL_SLOWEST_STATEMENTS', 3)
+
+    # the start time lives on the statement's execution context, not on a
+    # stack per connection, so a statement that raises leaves nothing behind
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context.query_start = time.perf_counter()
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = (time.perf_counter() - context.query_start) * 1000
+        if elapsed >= slow_ms:
+            app.logger.warning(json.dumps({
+                'event': 'slow_query',
+                'ms': round(elapsed, 2),
+                'statement': statement,
+            }))
+        if has_request_context():
+            g.setdefault('sql_queries', []).append((statement, repr(parameters), elapsed))
+
+    # the primary and every replica
+    with app.app_context():
+        for engine in db.engines.values():
+            event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+            event.listen(engine, 'after_cursor_execute', after_cursor_execute)
+
+    @app.after_request
+    def report_queries(response):
+        queries = g.pop('sql_queries', [])
+        report = summarize(queries, n_plus_one, top)
+        report['route'] = request.url_rule.rule if request.url_rule else request.path
+
+        if app.debug:
+            response.headers['X-DB-Query-Count'] = str(report['count'])
+            response.headers['X-DB-Time-Ms'] = '%.2f' % report['total_ms']
+            if report['n_plus_one']:
+                response.headers['X-DB-N-Plus-One'] = str(len(report['n_plus_one']))
+        else:
+            app.logger.info(json.dumps({'event': 'request_queries', **report}))
+        return response
+
+
+def summarize(queries, n_plus_one=3, top=3) -> dict:
+    params = defaultdict(list)
+    for statement, parameters, _ in queries:
+        params[statement].append(parameters)
+
+    slowest = sorted(queries, key=lambda q: q[2], reverse=True)[:top]
+    return {
+        'count': len(queries),
+        'total_ms': round(sum(q[2] for q in queries), 2),
+        'slowest': [{'ms': round(ms, 2), 'statement': st} for st, _, ms in slowest],
+        # the same statement run again and again with other parameters is
+        # almost always a relationship being lazy-loaded inside a loop
+        'n_plus_one': [{'executions': len(p), 'statement': st}
+                       for st, p in params.items() if len(set(p)) >= n_plus_one],
+    }
@@ -0,0 +1,225 @@
+import json
+import threading
+import time
+import traceback
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, case, func, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+
+from src.app import app
+from src.models import db, Job
+
+HANDLERS = {}
+
+jobs = Job.__table__
+
+
+#  Background jobs
+#  ----------------------------------------------------------------
+#  Derived work (read model rewrites, counters, index updates) is handed to
+#  `enqueue` instead of being done before the redirect. The job row is
+#  written in the caller's transaction, so it exists iff the write that
+#  asked for it commits. `flask worker` claims and runs queued jobs; a job
+#  enqueued again under the same key while still queued is coalesced into
+#  the queued one, so handlers should read the current state rather than
+#  trust their payload to be the latest.
+#  Without JOBS_ASYNC there is no queue: jobs run inside `enqueue`.
+
+def job(name):
+    """Registers the decorated function as the handler of `name`.
+    Handlers are called as handler(connection, **payload)."""
+    def register(handler):
+        HANDLERS[name] = handler
+        return handler
+    return register
+
+
+def _insert_queued(connection, values):
+    dialect = connection.dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        insert = (postgresql if dialect == 'postgresql' else sqlite).insert(jobs).values(values)
+        connection.execute(insert.on_conflict_do_nothing(
+            index_elements=['name', 'key'], index_where=jobs.c.status == 'queued'))
+        return
+    queued = connection.execute(select(jobs.c.id).where(
+        jobs.c.name == values['name'], jobs.c.key == values['key'], jobs.c.status == 'queued')).first()
+    if queued is None or values['key'] is None:
+        connection.execute(jobs.insert().values(values))
+
+
+def enqueue(name, payload=None, key=None, delay=0, connection=None):
+    """Queues the job `name`, or runs it right away without JOBS_ASYNC.
+
+    `connection` is the one of the write being made; mapper events pass
+    theirs, request handlers can leave it to the session's.
+    """
+    payload = payload or {}
+    connection = connection or db.session.connection()
+    if not app.config.get('JOBS_ASYNC', False):
+        HANDLERS[name](connection, **payload)
+        return
+    now = datetime.now()
+    _insert_queued(connection, {
+        'name': name,
+        'key': key,
+        'payload': json.dumps(payload),
+        'status': 'queued',
+        'attempts': 0,
+        'run_at': now + timedelta(seconds=delay),
+        'created_at': now,
+    })
+
+
+def queue_stats() -> dict:
+    """Depth and lag of the queue, in one query.
+
+    `lag_seconds` is how long the oldest due job has been waiting for a
+    worker; it stays near zero while the workers keep up.
+    """
+    now = datetime.now()
+    queued = jobs.c.status == 'queued'
+    row = db.session.execute(select(
+        func.count(case((queued, 1))).label('queued'),
+        func.count(case((and_(queued, jobs.c.run_at <= now), 1))).label('due'),
+        func.count(case((jobs.c.status == 'running', 1))).label('running'),
+        func.count(case((jobs.c.status == 'failed', 1))).label('failed'),
+        func.min(case((queued, jobs.c.run_at))).label('oldest'),
+    )).one()
+    lag = (now - row.oldest).total_seconds() if row.oldest and row.oldest <= now else 0
+    return {
+        'queued': row.queued,
+        'due': row.due,
+        'running': row.running,
+        'failed': row.failed,
+        'lag_seconds': round(lag, 3),
+    }
+
+
+def retry_failed() -> int:
+    result = db.session.execute(update(Job).where(Job.status == 'failed').values(
+        status='queued', attempts=0, run_at=datetime.now(), locked_at=None))
+    db.session.commit()
+    return result.rowcount
+
+
+#  Worker
+#  ----------------------------------------------------------------
+
+def claim():
+    """Takes the next due job, or None. Jobs left running longer than
+    JOB_TIMEOUT_SECONDS belong to a worker that died and are taken over."""
+    now = datetime.now()
+    stale = now - timedelta(seconds=app.config.get('JOB_TIMEOUT_SECONDS', 300))
+    claimable = or_(
+        and_(Job.status == 'queued', Job.run_at <= now),
+        and_(Job.status == 'running', Job.locked_at < stale),
+    )
+    # SKIP LOCKED lets concurrent workers pass over each other's candidates
+    # on Postgres; the conditional UPDATE below settles any race elsewhere
+    candidate = db.session.execute(
+        select(Job.id).where(claimable).order_by(Job.run_at).limit(1).with_for_update(skip_locked=True)
+    ).scalar()
+    if candidate is None:
+        db.session.rollback()
+        return None
+    claimed = db.session.execute(update(Job).where(Job.id == candidate, claimable).values(
+        status='running', locked_at=now, attempts=Job.attempts + 1))
+    db.session.commit()
+    if claimed.rowcount != 1:
+        return None
+    return db.session.get(Job, candidate)
+
+
+def run(job_row) -> bool:
+    """Runs a claimed job; on failure it is queued again with an exponential
+    backoff, up to JOB_MAX_ATTEMPTS attempts, then left as failed."""
+    job_id, name, attempts = job_row.id, job_row.name, job_row.attempts
+    try:
+        HANDLERS[name](db.session.connection(), **json.loads(job_row.payload))
+        db.session.execute(jobs.delete().where(jobs.c.id == job_id))
+        db.session.commit()
+        return True
+    except Exception:
+        db.session.rollback()
+        error = traceback.format_exc()
+        app.logger.warning(json.dumps({'event': 'job_failed', 'job': name, 'id': job_id, 'attempts': attempts}))
+
+    if attempts >= app.config.get('JOB_MAX_ATTEMPTS', 5):
+        values = {'status': 'failed', 'locked_at': None, 'last_error': error}
+    else:
+        values = {'status': 'queued', 'locked_at': None, 'last_error': error,
+                  'run_at': datetime.now() + timedelta(seconds=2 ** attempts)}
+    try:
+        db.session.execute(jobs.update().where(jobs.c.id == job_id).values(values))
+        db.session.commit()
+    except IntegrityError:
+        # the same job was queued again meanwhile; that one will do
+        db.session.rollback()
+        db.session.execute(jobs.delete().where(jobs.c.id == job_id))
+        db.session.commit()
+    return False
+
+
+class Worker:
+    """Runs queued jobs on `threads` threads until stopped, or with `once`
+    until no job is due. Several workers, in as many processes, can share
+    the queue."""
+
+    def __init__(self, threads=1, once=False):
+        self.threads = threads
+        self.once = once
+        self.stopping = threading.Event()
+        self.lock = threading.Lock()
+        self.counts = {}
+
+    def _record(self, name, ok, seconds):
+        with self.lock:
+            done, failed, total = self.counts.get(name, (0, 0, 0.0))
+            self.counts[name] = (done + ok, failed + (not ok), total + seconds)
+
+    def _loop(self):
+        poll = app.config.get('JOB_POLL_SECONDS', 1)
+        with app.app_context():
+            while not self.stopping.is_set():
+                job_row = claim()
+                if job_row is None:
+                    if self.once:
+                        return
+                    self.stopping.wait(poll)
+                    continue
+                name, start = job_row.name, time.perf_counter()
+                ok = run(job_row)
+                self._record(name, ok, time.perf_counter() - start)
+                db.session.remove()
+
+    def report(self) -> dict:
+        with self.lock:
+            counts, self.counts = self.counts, {}
+        with app.app_context():
+            stats = queue_stats()
+            db.session.remove()
+        stats['jobs'] = {
+            name: {'done': done, 'failed': failed, 'mean_ms': round(1000 * total / ((done + failed) or 1), 2)}
+            for name, (done, failed, total) in counts.items()
+        }
+        return stats
+
+    def run(self):
+        threads = [threading.Thread(target=self._loop, name='worker-%d' % i, daemon=True)
+                   for i in range(self.threads)]
+        for thread in threads:
+            thread.start()
+        interval = app.config.get('JOB_METRICS_SECONDS', 60)
+        try:
+            while any(thread.is_alive() for thread in threads):
+                for thread in threads:
+                    thread.join(interval / len(threads))
+                if not self.once:
+                    app.logger.info(json.dumps({'event': 'job_metrics', **self.report()}))
+        except KeyboardInterrupt:
+            self.stopping.set()
+            for thread in threads:
+                thread.join()
+        return self.report()
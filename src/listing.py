@@ -0,0 +1,95 @@
+
+from sqlalchemy import event, inspect, select
+
+from src.jobs import enqueue, job
+from src.models import db, utcnow, Artist, Show, ShowListing, Venue
+
+# what each ShowListing row is made of, in the order of its columns
+LISTING_SOURCE = select(
+    Show.id, Show.start_time,
+    Show.artist_id, Artist.name, Artist.image_link,
+    Show.venue_id, Venue.name, Venue.image_link,
+).join(Artist, Show.artist_id == Artist.id).join(Venue, Show.venue_id == Venue.id)
+LISTING_COLUMNS = [c.name for c in ShowListing.__table__.columns]
+
+listing = ShowListing.__table__
+
+
+#  Show listing read model
+#  ----------------------------------------------------------------
+#  Rows are refreshed in the same transaction as the write that changes
+#  them: by the mapper events below for anything going through the ORM, and
+#  by explicit calls from the bulk writers that bypass it. A renamed venue or
+#  artist touches all of its shows, which is left to a background job.
+
+def refresh_shows(connection, ids):
+    """Rewrites the listing rows of the shows `ids`."""
+    ids = list(ids)
+    if not ids:
+        return
+    connection.execute(listing.delete().where(listing.c.id.in_(ids)))
+    connection.execute(listing.insert().from_select(LISTING_COLUMNS, LISTING_SOURCE.where(Show.id.in_(ids))))
+
+
+def forget_shows(connection, ids):
+    ids = list(ids)
+    if ids:
+        connection.execute(listing.delete().where(listing.c.id.in_(ids)))
+
+
+def rebuild_listing():
+    db.session.execute(listing.delete())
+    db.session.execute(listing.insert().from_select(LISTING_COLUMNS, LISTING_SOURCE))
+    db.session.commit()
+
+
+def _changed(target, *attributes):
+    state = inspect(target)
+    return any(state.attrs[a].history.has_changes() for a in attributes)
+
+
+@event.listens_for(Show, 'after_insert')
+def _show_inserted(mapper, connection, target):
+    refresh_shows(connection, [target.id])
+
+
+@event.listens_for(Show, 'after_update')
+def _show_updated(mapper, connection, target):
+    if _changed(target, 'start_time', 'artist_id', 'venue_id'):
+        refresh_shows(connection, [target.id])
+
+
+@event.listens_for(Show, 'after_delete')
+def _show_deleted(mapper, connection, target):
+    forget_shows(connection, [target.id])
+
+
+DENORMALIZED = {'venue': Venue, 'artist': Artist}
+
+
+@job('listing.rename')
+def rename(connection, kind, id):
+    """Copies the current name and image of a venue or artist to its listing
+    rows, in one UPDATE through the (kind_id, start_time) index."""
+    model = DENORMALIZED[kind]
+    row = connection.execute(select(model.name, model.image_link).where(model.id == id)).first()
+    if row is None:
+        return
+    connection.execute(listing.update().where(listing.c[kind + '_id'] == id).values({
+        kind + '_name': row.name,
+        kind + '_image_link': row.image_link,
+    }))
+    # the pages built from the old rows carry the entity's stamp; move it on
+    connection.execute(model.__table__.update().where(model.id == id).values(updated_at=utcnow()))
+
+
+def _denormalized(model, kind):
+    @event.listens_for(model, 'after_update')
+    def entity_updated(mapper, connection, target):
+        if _changed(target, 'name', 'image_link'):
+            enqueue('listing.rename', {'kind': kind, 'id': target.id},
+                    key='%s:%d' % (kind, target.id), connection=connection)
+
+
+for kind, model in DENORMALIZED.items():
+    _denormalized(model, kind)
@@ -1,28 +1,104 @@
-from flask_migrate import Migrate
+import os
+from datetime import datetime, timezone
+
+import click
 from flask_sqlalchemy import SQLAlchemy
-from src import app
+from sqlalchemy import event
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.ext.associationproxy import association_proxy
+from src.instrumentation import init_instrumentation
+from src.routing import RoutingSession, add_replica_binds, init_routing
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+
+def utcnow():
+    # naive UTC, for the updated_at stamps that Last-Modified is built from
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def init_db(app):
+    add_replica_binds(app)
+    db.init_app(app)
+    init_routing(app, db)
+
+    if app.config.get('SQL_INSTRUMENTATION'):
+        init_instrumentation(app, db)
+
+    # only the `flask db` commands use Flask-Migrate, and importing it (alembic,
+    # mako) takes longer than the rest of the app together
+    if click.get_current_context(silent=True) is not None:
+        from flask_migrate import Migrate
+        Migrate(app, db)
+
+    def dispose_engines():
+        # a forked worker must not use the pooled connections of its parent
+        with app.app_context():
+            for engine in db.engines.values():
+                engine.dispose(close=False)
+    os.register_at_fork(after_in_child=dispose_engines)
+
+
+class Genre(db.Model):
+    __tablename__ = 'Genre'
+    id = db.Column(db.Integer, primary_key=True)  # noqa
+    name = db.Column(db.String(120), nullable=False, unique=True, index=True)  # noqa
+
+    def __repr__(self):
+        return f"<Genre {self.id} {self.name}>"
+
+
+def genre_named(name):
+    # creator of the `genres` proxies: reuse the row, or the one about to be inserted
+    for obj in db.session.new:
+        if isinstance(obj, Genre) and obj.name == name:
+            return obj
+    with db.session.no_autoflush:
+        return Genre.query.filter_by(name=name).one_or_none() or Genre(name=name)
+
 
-db = SQLAlchemy(app)
-migrate = Migrate(app, db)
+# the primary keys serve an entity's genres, the (genre_id, ...) index a genre's entities
+venue_genres = db.Table(
+    'VenueGenre',
+    db.Column('venue_id', db.Integer, db.ForeignKey('Venue.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('genre_id', db.Integer, db.ForeignKey('Genre.id'), primary_key=True),
+    db.Index('ix_VenueGenre_genre_id_venue_id', 'genre_id', 'venue_id'),
+)
+artist_genres = db.Table(
+    'ArtistGenre',
+    db.Column('artist_id', db.Integer, db.ForeignKey('Artist.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('genre_id', db.Integer, db.ForeignKey('Genre.id'), primary_key=True),
+    db.Index('ix_ArtistGenre_genre_id_artist_id', 'genre_id', 'artist_id'),
+)
 
 
 class Venue(db.Model):
     __tablename__ = 'Venue'
+    __table_args__ = (
+        db.Index('ix_Venue_state_city_name', 'state', 'city', 'name'),
+    )
     id = db.Column(db.Integer, primary_key=True)  # noqa
-    name = db.Column(db.String)  # noqa
-    city = db.Column(db.String(120))  # noqa
-    state = db.Column(db.String(120))  # noqa
+    # not null: they are keyset pagination keys, where NULL rows would be skipped
+    name = db.Column(db.String, nullable=False)  # noqa
+    city = db.Column(db.String(120), nullable=False)  # noqa
+    state = db.Column(db.String(120), nullable=False)  # noqa
     address = db.Column(db.String(120))  # noqa
     phone = db.Column(db.String(120))  # noqa
     image_link = db.Column(db.String(500))  # noqa
     facebook_link = db.Column(db.String(120))  # noqa
 
     # DONE: implement any missing fields, as a database migration using Flask-Migrate
-    genres = db.Column(db.ARRAY(db.String(120)))  # noqa
+    genre_rows = db.relationship('Genre', secondary=venue_genres, order_by=Genre.name)  # noqa
+    # genre names as a plain list, for the forms and templates
+    genres = association_proxy('genre_rows', 'name', creator=genre_named)  # noqa
     shows = db.relationship('Show', backref='venue',
                             lazy=True, cascade='all, delete-orphan')  # noqa
     seeking_description = db.Column(db.String(120), nullable=True)  # noqa
     website = db.Column(db.String(120))  # noqa
+    # maintained by a database trigger, see the search migration
+    search_vector = db.deferred(db.Column(db.Text().with_variant(TSVECTOR(), 'postgresql')))  # noqa
+    updated_at = db.Column(db.DateTime, nullable=False, index=True, default=utcnow,
+                           onupdate=utcnow, server_default=db.func.now())  # noqa
 
     def __repr__(self):
         return f"<Venue {self.id} {self.name}>"
@@ -31,31 +107,120 @@ class Venue(db.Model):
 class Artist(db.Model):
     __tablename__ = 'Artist'
     id = db.Column(db.Integer, primary_key=True)  # noqa
-    name = db.Column(db.String)  # noqa
-    city = db.Column(db.String(120))  # noqa
-    state = db.Column(db.String(120))  # noqa
+    # not null: they are keyset pagination keys, where NULL rows would be skipped
+    name = db.Column(db.String, nullable=False)  # noqa
+    city = db.Column(db.String(120), nullable=False)  # noqa
+    state = db.Column(db.String(120), nullable=False)  # noqa
     phone = db.Column(db.String(120))  # noqa
     image_link = db.Column(db.String(500))  # noqa
     facebook_link = db.Column(db.String(120))  # noqa
 
     # DONE: implement any missing fields, as a database migration using Flask-Migrate
-    genres = db.Column(db.ARRAY(db.String(120)))  # noqa
+    genre_rows = db.relationship('Genre', secondary=artist_genres, order_by=Genre.name)  # noqa
+    # genre names as a plain list, for the forms and templates
+    genres = association_proxy('genre_rows', 'name', creator=genre_named)  # noqa
     shows = db.relationship('Show', backref='artist',
                             lazy=True, cascade='all, delete-orphan')  # noqa
     seeking_description = db.Column(db.String(120), nullable=True)  # noqa
     website = db.Column(db.String(120))  # noqa
+    # maintained by a database trigger, see the search migration
+    search_vector = db.deferred(db.Column(db.Text().with_variant(TSVECTOR(), 'postgresql')))  # noqa
+    updated_at = db.Column(db.DateTime, nullable=False, index=True, default=utcnow,
+                           onupdate=utcnow, server_default=db.func.now())  # noqa
 
     def __repr__(self):
         return f"<Artist {self.id} {self.name}>"
 
 
+@event.listens_for(Venue.genre_rows, 'append')
+@event.listens_for(Venue.genre_rows, 'remove')
+@event.listens_for(Artist.genre_rows, 'append')
+@event.listens_for(Artist.genre_rows, 'remove')
+def touch(target, value, initiator):
+    # genres live in another table, so a change to them alone would not
+    # move updated_at, which page versions and the search index go by
+    target.updated_at = utcnow()
+
+
 # DONE Implement Show and Artist models, and complete all model relationships and properties, as a database migration.
 class Show(db.Model):
     __tablename__ = 'Show'
+    __table_args__ = (
+        db.Index('ix_Show_venue_id_start_time', 'venue_id', 'start_time'),
+        db.Index('ix_Show_artist_id_start_time', 'artist_id', 'start_time'),
+    )
     id = db.Column(db.Integer, primary_key=True)  # noqa
     artist_id = db.Column(db.Integer, db.ForeignKey('Artist.id'), nullable=False)  # noqa
     venue_id = db.Column(db.Integer, db.ForeignKey('Venue.id'), nullable=False)  # noqa
     start_time = db.Column(db.DateTime, nullable=False)  # noqa
+    updated_at = db.Column(db.DateTime, nullable=False, index=True, default=utcnow,
+                           onupdate=utcnow, server_default=db.func.now())  # noqa
 
     def __repr__(self):
         return f"<Show {self.id} {self.artist_id} <-> {self.venue_id}"
+
+
+class ShowListing(db.Model):
+    """Read model of the hot shows with the artist and venue fields every
+    listing displays, so listings read one table. Kept up to date by
+    src.listing; never written directly."""
+    __tablename__ = 'ShowListing'
+    __table_args__ = (
+        db.Index('ix_ShowListing_start_time_id', 'start_time', 'id'),
+        db.Index('ix_ShowListing_venue_id_start_time', 'venue_id', 'start_time'),
+        db.Index('ix_ShowListing_artist_id_start_time', 'artist_id', 'start_time'),
+    )
+    id = db.Column(db.Integer, db.ForeignKey('Show.id', ondelete='CASCADE'), primary_key=True,
+                   autoincrement=False)  # noqa
+    start_time = db.Column(db.DateTime, nullable=False)  # noqa
+    artist_id = db.Column(db.Integer, nullable=False)  # noqa
+    artist_name = db.Column(db.String)  # noqa
+    artist_image_link = db.Column(db.String(500))  # noqa
+    venue_id = db.Column(db.Integer, nullable=False)  # noqa
+    venue_name = db.Column(db.String)  # noqa
+    venue_image_link = db.Column(db.String(500))  # noqa
+
+    def __repr__(self):
+        return f"<ShowListing {self.id} {self.artist_name} <-> {self.venue_name}"
+
+
+class ShowArchive(db.Model):
+    """Shows older than SHOW_ARCHIVE_HORIZON_DAYS, moved out of Show by
+    `flask archive-shows`. On Postgres the table is partitioned by month."""
+    __tablename__ = 'ShowArchive'
+    __table_args__ = (
+        db.Index('ix_ShowArchive_venue_id_start_time', 'venue_id', 'start_time'),
+        db.Index('ix_ShowArchive_artist_id_start_time', 'artist_id', 'start_time'),
+    )
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)  # noqa
+    artist_id = db.Column(db.Integer, db.ForeignKey('Artist.id', ondelete='CASCADE'), nullable=False)  # noqa
+    venue_id = db.Column(db.Integer, db.ForeignKey('Venue.id', ondelete='CASCADE'), nullable=False)  # noqa
+    start_time = db.Column(db.DateTime, nullable=False)  # noqa
+    updated_at = db.Column(db.DateTime, nullable=False)  # noqa
+
+    def __repr__(self):
+        return f"<ShowArchive {self.id} {self.artist_id} <-> {self.venue_id}"
+
+
+class Job(db.Model):
+    """Queued background work, see src.jobs."""
+    __tablename__ = 'Job'
+    __table_args__ = (
+        db.Index('ix_Job_status_run_at', 'status', 'run_at'),
+        # at most one queued job per (name, key): enqueueing it again is a no-op
+        db.Index('ix_Job_name_key_queued', 'name', 'key', unique=True,
+                 postgresql_where=db.text("status = 'queued'"), sqlite_where=db.text("status = 'queued'")),
+    )
+    id = db.Column(db.Integer, primary_key=True)  # noqa
+    name = db.Column(db.String(120), nullable=False)  # noqa
+    key = db.Column(db.String(255))  # noqa
+    payload = db.Column(db.Text, nullable=False, default='{}')  # noqa
+    status = db.Column(db.String(20), nullable=False, default='queued')  # noqa
+    attempts = db.Column(db.Integer, nullable=False, default=0)  # noqa
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.now)  # noqa
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.now)  # noqa
+    locked_at = db.Column(db.DateTime)  # noqa
+    last_error = db.Column(db.Text)  # noqa
+
+    def __repr__(self):
+        return f"<Job {self.id} {self.name} {self.key} {self.status}>"
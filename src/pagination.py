@@ -0,0 +1,130 @@
+import base64
+import json
+from datetime import datetime
+
+from flask import current_app, request
+from sqlalchemy import DateTime, tuple_
+
+
+class Page:
+    def __init__(self, items, next_cursor=None, prev_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+class StreamedPage(Page):
+    """A forward page read lazily from a server-side cursor.
+
+    The cursors are only known once the rows have been iterated, which is fine
+    for templates that render the pager below the list.
+    """
+
+    def __init__(self, query, key, limit, after, batch_size=100):
+        super().__init__(items=None)
+        self.query = query
+        self.key = key
+        self.limit = limit
+        self.after = after
+        self.batch_size = batch_size
+
+    def __iter__(self):
+        rows = self.query.limit(self.limit + 1) \
+            .execution_options(stream_results=True) \
+            .yield_per(self.batch_size)
+        last = None
+        for n, row in enumerate(rows):
+            if n == self.limit:
+                self.next_cursor = encode_cursor(self.key(last))
+                break
+            if n == 0 and self.after:
+                self.prev_cursor = encode_cursor(self.key(row))
+            last = row
+            yield row
+
+    def __len__(self):
+        raise TypeError('a streamed page has no length before it is consumed')
+
+
+def page_size() -> int:
+    # ?limit= is honoured, but never above MAX_PAGE_SIZE
+    default = current_app.config.get('PAGE_SIZE', 30)
+    maximum = current_app.config.get('MAX_PAGE_SIZE', 100)
+    limit = request.args.get('limit', default, type=int)
+    return max(1, min(limit, maximum))
+
+
+def encode_cursor(values) -> str:
+    values = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(values, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str, columns) -> tuple:
+    """Raises ValueError for a cursor that was not made by encode_cursor."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError(cursor)
+        return tuple(
+            datetime.fromisoformat(v) if isinstance(c.type, DateTime) else v
+            for c, v in zip(columns, values)
+        )
+    except (ValueError, TypeError):
+        raise ValueError('invalid cursor: %r' % cursor) from None
+
+
+def keyset_page(query, columns, key=None, limit=None, stream=False, descending=False) -> Page:
+    """Paginates `query` by the unique sort key `columns`, ascending unless
+    `descending`.
+
+    The cursors are taken from ?after= / ?before=, so the database only ever
+    reads one page worth of rows, no matter how deep the user goes.
+    With `stream`, forward pages are returned as a StreamedPage; backward pages
+    are always buffered since their rows come out of the database reversed.
+    Raises ValueError when a cursor is malformed, for the caller to answer
+    with a 400 in its own format.
+    """
+    if limit is None:
+        limit = page_size()
+    if key is None:
+        def key(row):
+            return tuple(getattr(row, c.key) for c in columns)
+
+    after = request.args.get('after')
+    before = request.args.get('before')
+    sort_key = tuple_(*columns)
+
+    forward = [c.desc() for c in columns] if descending else list(columns)
+    backward = list(columns) if descending else [c.desc() for c in columns]
+    if before:
+        cursor = decode_cursor(before, columns)
+        query = query.filter(sort_key > cursor if descending else sort_key < cursor)
+        query = query.order_by(*backward)
+    else:
+        if after:
+            cursor = decode_cursor(after, columns)
+            query = query.filter(sort_key < cursor if descending else sort_key > cursor)
+        query = query.order_by(*forward)
+        if stream:
+            return StreamedPage(query, key, limit, after)
+
+    rows = query.limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if before:
+        rows.reverse()
+    if not rows:
+        return Page(rows)
+
+    first, last = encode_cursor(key(rows[0])), encode_cursor(key(rows[-1]))
+    if before:
+        return Page(rows, next_cursor=last, prev_cursor=first if has_more else None)
+    return Page(rows, next_cursor=last if has_more else None, prev_cursor=first if after else None)
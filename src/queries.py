@@ -0,0 +1,167 @@
+from datetime import datetime
+
+from sqlalchemy import and_, case, func, tuple_, union_all
+from sqlalchemy.orm import Query
+
+from src.listing import listing
+from src.models import db, artist_genres, venue_genres, Artist, Genre, Show, ShowArchive, ShowListing, Venue
+
+
+# Every show listing needs a handful of artist and venue columns next to the show.
+# Reading them through `show.artist` / `show.venue` costs one or two SELECTs per row;
+# for the hot shows they are kept in the ShowListing read model (see src.listing),
+# archived shows join them in.
+SHOW_LISTING_COLUMNS = tuple(getattr(ShowListing, c.name) for c in listing.columns)
+
+
+def archive_listing_columns() -> tuple:
+    return (
+        ShowArchive.id,
+        ShowArchive.start_time,
+        ShowArchive.artist_id,
+        Artist.name.label('artist_name'),
+        Artist.image_link.label('artist_image_link'),
+        ShowArchive.venue_id,
+        Venue.name.label('venue_name'),
+        Venue.image_link.label('venue_image_link'),
+    )
+
+
+def show_listing(shows=ShowListing) -> Query:
+    """Listing rows of the hot shows, a single table, or of ShowArchive."""
+    if shows is ShowListing:
+        return db.session.query(*SHOW_LISTING_COLUMNS)
+    return db.session.query(*archive_listing_columns()) \
+        .join(Artist, shows.artist_id == Artist.id) \
+        .join(Venue, shows.venue_id == Venue.id)
+
+
+def entity_with_shows(model, key, entity_id: int, limit: int):
+    """Loads a venue or artist together with its shows in one round trip.
+
+    `key` is the Show column pointing at `model`; the shows are read from
+    the ShowListing read model. Each section, upcoming and
+    past, is cut to the `limit` shows nearest to now by a window function,
+    which also counts the whole section. Archived shows are only read when
+    the hot past shows do not fill the section; otherwise they are only
+    counted. Returns
+    (entity, past_shows, upcoming_shows, past_count, upcoming_count),
+    or None if there is no such entity.
+    """
+    upcoming = ShowListing.start_time > datetime.now()
+    rank = case(
+        (upcoming, func.row_number().over(partition_by=upcoming, order_by=ShowListing.start_time.asc())),
+        else_=func.row_number().over(partition_by=upcoming, order_by=ShowListing.start_time.desc()),
+    )
+    shows = show_listing().filter(getattr(ShowListing, key.key) == entity_id).add_columns(
+        upcoming.label('upcoming'),
+        rank.label('section_rank'),
+        func.count().over(partition_by=upcoming).label('section_count'),
+    ).subquery()
+
+    rows = db.session.query(model, shows) \
+        .outerjoin(shows, shows.c.section_rank <= limit) \
+        .filter(model.id == entity_id) \
+        .order_by(shows.c.upcoming, shows.c.section_rank) \
+        .all()
+    if not rows:
+        return None
+
+    past, upcoming, counts = [], [], {True: 0, False: 0}
+    for row in rows:
+        if row.id is None:
+            continue
+        (upcoming if row.upcoming else past).append(row)
+        counts[bool(row.upcoming)] = row.section_count
+
+    archived, archived_count = archived_shows(getattr(ShowArchive, key.key), entity_id, limit - len(past))
+    return rows[0][0], past + archived, upcoming, counts[False] + archived_count, counts[True]
+
+
+def archived_shows(key, entity_id: int, limit: int):
+    """The `limit` latest archived shows of a venue or artist, and how many
+    there are in all. `key` is the ShowArchive column pointing at the entity."""
+    if limit <= 0:
+        return [], db.session.query(func.count(ShowArchive.id)).filter(key == entity_id).scalar()
+    rows = show_listing(ShowArchive) \
+        .add_columns(func.count().over().label('section_count')) \
+        .filter(key == entity_id) \
+        .order_by(ShowArchive.start_time.desc(), ShowArchive.id.desc()) \
+        .limit(limit).all()
+    return rows, rows[0].section_count if rows else 0
+
+
+def past_shows(key, entity_id: int):
+    """Every past show of a venue or artist, hot and archived, as one query
+    to page through newest first. Returns (query, sort key columns)."""
+    hot = show_listing().filter(getattr(ShowListing, key.key) == entity_id,
+                                ShowListing.start_time <= datetime.now())
+    cold = show_listing(ShowArchive).filter(getattr(ShowArchive, key.key) == entity_id)
+    shows = union_all(hot.statement, cold.statement).subquery()
+    return db.session.query(shows), (shows.c.start_time, shows.c.id)
+
+
+def upcoming_show_counts(key, ids) -> dict:
+    """Maps each id in `ids` to its number of upcoming shows, in one GROUP BY.
+
+    `key` is the Show column to group on, `Show.venue_id` or `Show.artist_id`.
+    Ids without upcoming shows are left out of the result.
+    """
+    if not ids:
+        return {}
+    rows = db.session.query(key, func.count(Show.id)) \
+        .filter(key.in_(ids), Show.start_time > datetime.now()) \
+        .group_by(key)
+    return dict(rows.all())
+
+
+def venue_areas() -> Query:
+    """One row per (state, city) with the number of upcoming shows in that area."""
+    return db.session.query(
+        Venue.state,
+        Venue.city,
+        func.count(Show.id).label('num_upcoming_shows'),
+    ).outerjoin(Show, and_(Show.venue_id == Venue.id, Show.start_time > datetime.now())) \
+        .group_by(Venue.state, Venue.city)
+
+
+def venues_in_areas(areas) -> Query:
+    return db.session.query(Venue.id, Venue.name, Venue.city, Venue.state) \
+        .filter(tuple_(Venue.state, Venue.city).in_([(a.state, a.city) for a in areas])) \
+        .order_by(Venue.state, Venue.city, Venue.name, Venue.id)
+
+
+def genre_listing(name: str, limit: int):
+    """Venues, artists and upcoming shows (of its artists) for one genre.
+
+    The genre is found by its unique name, its venues and artists through the
+    (genre_id, ...) indexes of the association tables. Each list is cut to
+    `limit` rows and carries its full length in `total`. Returns None if there
+    is no such genre.
+    """
+    genre_id = db.session.query(Genre.id).filter(Genre.name == name).scalar()
+    if genre_id is None:
+        return None
+    total = func.count().over().label('total')
+
+    venues = db.session.query(Venue.id, Venue.name, Venue.city, Venue.state, total) \
+        .join(venue_genres, venue_genres.c.venue_id == Venue.id) \
+        .filter(venue_genres.c.genre_id == genre_id) \
+        .order_by(Venue.name, Venue.id).limit(limit).all()
+    artists = db.session.query(Artist.id, Artist.name, Artist.city, Artist.state, total) \
+        .join(artist_genres, artist_genres.c.artist_id == Artist.id) \
+        .filter(artist_genres.c.genre_id == genre_id) \
+        .order_by(Artist.name, Artist.id).limit(limit).all()
+    shows = show_listing().add_columns(total) \
+        .join(artist_genres, artist_genres.c.artist_id == ShowListing.artist_id) \
+        .filter(artist_genres.c.genre_id == genre_id, ShowListing.start_time > datetime.now()) \
+        .order_by(ShowListing.start_time, ShowListing.id).limit(limit).all()
+    return {
+        'name': name,
+        'venues': venues,
+        'artists': artists,
+        'upcoming_shows': shows,
+        'venues_count': venues[0].total if venues else 0,
+        'artists_count': artists[0].total if artists else 0,
+        'upcoming_shows_count': shows[0].total if shows else 0,
+    }
@@ -0,0 +1,61 @@
+import random
+import time
+
+from flask import g, has_request_context, request, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+
+REPLICA_PREFIX = 'replica_'
+
+
+class RoutingSession(Session):
+    """Sends the reads of GET/HEAD requests to a read replica.
+
+    Everything else goes to the primary: other methods, CLI commands, and any
+    statement issued while the session has pending changes or is flushing.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and not (self.new or self.dirty or self.deleted):
+            replica = g.get('db_replica') if has_request_context() else None
+            if replica is not None:
+                return self._db.engines[replica]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def add_replica_binds(app):
+    """Registers SQLALCHEMY_REPLICA_URIS as binds, so the engines are set up
+    like the primary's. Must run before SQLAlchemy(app)."""
+    binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+    for i, uri in enumerate(app.config.get('SQLALCHEMY_REPLICA_URIS') or []):
+        binds[REPLICA_PREFIX + str(i)] = uri
+    app.config['SQLALCHEMY_BINDS'] = binds
+
+
+def init_routing(app, db):
+    replicas = [key for key in app.config['SQLALCHEMY_BINDS'] if key.startswith(REPLICA_PREFIX)]
+    if not replicas:
+        return
+    window = app.config.get('READ_YOUR_WRITES_SECONDS', 5)
+
+    @app.before_request
+    def choose_replica():
+        # a client that just wrote reads from the primary for a while, so it
+        # sees its own change even if the replicas lag behind
+        recent_write = time.time() - session.get('_last_write', 0) < window
+        if request.method in ('GET', 'HEAD') and not recent_write:
+            g.db_replica = random.choice(replicas)
+
+    @event.listens_for(RoutingSession, 'after_commit')
+    def remember_write(db_session):
+        if has_request_context() and g.get('db_wrote'):
+            session['_last_write'] = time.time()
+
+    def flag_write(connection, cursor, statement, parameters, context, executemany):
+        # on the engine rather than the session, so it also sees Core
+        # statements run on the session's connection (book_tour, refresh_shows)
+        if has_request_context() and (context.isinsert or context.isupdate or context.isdelete):
+            g.db_wrote = True
+
+    with app.app_context():
+        event.listen(db.engine, 'after_cursor_execute', flag_write)
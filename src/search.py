@@ -0,0 +1,123 @@
+import time
+from collections import Counter, defaultdict, namedtuple
+
+from flask import current_app
+from sqlalchemy import event, func, or_
+
+from src.cache import get_cache
+from src.genres import genres_by_id
+from src.models import db, Artist, Venue
+
+Hit = namedtuple('Hit', 'id name')
+
+
+def search(model, term: str, limit: int = None) -> list:
+    """Venues or artists matching `term`, best match first.
+
+    The name is matched as a case-insensitive substring, name, city, state and
+    genres as whole words. Postgres answers from the tsvector and trigram
+    indexes, any other database from an in-process index.
+    """
+    term = term.strip()
+    if limit is None:
+        limit = current_app.config.get('SEARCH_LIMIT', 50)
+    if not term:
+        return []
+
+    backend = current_app.config.get('SEARCH_BACKEND', 'auto')
+    if backend == 'auto':
+        backend = 'postgres' if db.engine.dialect.name == 'postgresql' else 'memory'
+    if backend == 'postgres':
+        return _postgres_search(model, term, limit)
+    return _memory_indexes[model].search(term, limit)
+
+
+def _postgres_search(model, term, limit):
+    query = func.plainto_tsquery('simple', term)
+    pattern = '%' + term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+    rank = func.ts_rank(model.search_vector, query) + func.similarity(model.name, term)
+    rows = db.session.query(model.id, model.name).filter(or_(
+        model.search_vector.op('@@')(query),
+        model.name.ilike(pattern, escape='\\'),
+    )).order_by(rank.desc(), model.id).limit(limit)
+    return [Hit(*row) for row in rows]
+
+
+def trigrams(text: str) -> set:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class MemoryIndex:
+    """Trigram index over one model, for databases without pg_trgm.
+
+    It is built on first use and kept by each process. A row of the model
+    flushed in this process throws it away. Writes of other processes reach
+    it through the cache tag of the model (`invalidate('venues')`), which is
+    only shared between processes by the redis cache backend; the index is
+    rebuilt at least every SEARCH_INDEX_MAX_AGE seconds regardless.
+    """
+
+    def __init__(self, model, tag):
+        self.model = model
+        self.tag = tag
+        self.names = {}
+        self.words = None
+        self.grams = None
+        self.version = None
+        self.built_at = 0.0
+        event.listen(model, 'after_insert', self.invalidate)
+        event.listen(model, 'after_update', self.invalidate)
+        event.listen(model, 'after_delete', self.invalidate)
+
+    def invalidate(self, *args):
+        self.grams = None
+
+    def build(self):
+        m = self.model
+        names, words, grams = {}, defaultdict(set), defaultdict(set)
+        genres = genres_by_id(m)
+        for id_, name, city, state in db.session.query(m.id, m.name, m.city, m.state):
+            name = name or ''
+            names[id_] = name
+            for word in ' '.join([name, city or '', state or ''] + genres.get(id_, [])).lower().split():
+                words[word].add(id_)
+            for gram in trigrams(name.lower()):
+                grams[gram].add(id_)
+        self.names, self.words, self.grams = names, words, grams
+
+    def search(self, term: str, limit: int) -> list:
+        # read before building, so a write made meanwhile is picked up next time
+        version = get_cache().versions([self.tag])[0]
+        max_age = current_app.config.get('SEARCH_INDEX_MAX_AGE', 300)
+        if self.grams is None or version != self.version or time.monotonic() - self.built_at > max_age:
+            self.built_at = time.monotonic()
+            self.build()
+            self.version = version
+        needle = term.lower()
+        terms = needle.split()
+
+        grams = trigrams(needle)
+        if grams:
+            # a substring match has to contain every trigram of the term
+            hits = Counter(i for gram in grams for i in self.grams.get(gram, ()))
+            candidates = {i for i, n in hits.items() if n == len(grams)}
+        else:
+            candidates = set(self.names)
+        scores = {}
+        for i in candidates:
+            if needle in self.names[i].lower():
+                scores[i] = 2 + len(needle) / max(len(self.names[i]), 1)
+        for i in set.intersection(*[self.words.get(t, set()) for t in terms]):
+            scores[i] = scores.get(i, 0) + 1
+
+        best = sorted(scores, key=lambda i: (-scores[i], i))[:limit]
+        return [Hit(i, self.names[i]) for i in best]
+
+
+_memory_indexes = {Venue: MemoryIndex(Venue, 'venues'), Artist: MemoryIndex(Artist, 'artists')}
+
+
+def invalidate_indexes():
+    # for writes that bypass the ORM, like the bulk import
+    for index in _memory_indexes.values():
+        index.invalidate()
@@ -0,0 +1,35 @@
+from flask import Response, current_app, render_template, stream_with_context
+
+from src.models import db
+
+
+def streaming_enabled() -> bool:
+    return current_app.config.get('STREAM_LIST_PAGES', False)
+
+
+def render_list(template_name, **context):
+    """Renders a list page, streamed when STREAM_LIST_PAGES is on.
+
+    Streamed, the first bytes go out before the rows are fetched and the
+    template is sent in chunks of STREAM_BUFFER_SIZE events as it renders;
+    the session's connection is released when the body has been sent.
+    Otherwise this is just render_template().
+    """
+    if not streaming_enabled():
+        return render_template(template_name, **context)
+
+    app = current_app._get_current_object()
+    app.update_template_context(context)
+    stream = app.jinja_env.get_template(template_name).stream(context)
+    stream.enable_buffering(app.config.get('STREAM_BUFFER_SIZE', 32))
+    # the rows are read while the body is sent, through the queries the view
+    # built on this session; the session may have been removed by then
+    session = db.session()
+
+    def chunks():
+        try:
+            yield from stream
+        finally:
+            # hands back the connection the rows were read on
+            session.close()
+    return Response(stream_with_context(chunks()), mimetype='text/html')
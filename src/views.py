@@ -1,26 +1,47 @@
-from typing import List
+from itertools import groupby
 
-from flask import flash, redirect, render_template, request, url_for, jsonify
+from flask import abort, flash, redirect, render_template, request, url_for, jsonify
 
-from src import app, Artist, db, Show, Venue
+from src.app import app
+from src.models import db, Artist, Show, ShowListing, Venue
+from src.booking import book_tour, check_tour, parse_dates, recurring_dates
+from src.cache import cached_fragment, cached_page, invalidate
+from src.conditional import artist_stamp, collection_stamp, conditional, time_bucket, venue_stamp
 from src.forms import *
+from src.pagination import keyset_page
+from src.queries import (
+    entity_with_shows, genre_listing, past_shows, show_listing, upcoming_show_counts, venue_areas,
+    venues_in_areas,
+)
+from src.search import search
+from src.streaming import render_list, streaming_enabled
+
+
+def page_or_400(query, columns, **kwargs):
+    try:
+        return keyset_page(query, columns, **kwargs)
+    except ValueError:  # a cursor that was tampered with
+        abort(400)
+
 
 @app.route('/')
+@conditional(lambda: collection_stamp(Venue, Artist))
+@cached_page('venues', 'artists')
 def index():
     # recent venues
     # https://stackoverflow.com/questions/4186062/sqlalchemy-order-by-descending
-    rv = [{
+    rv = cached_fragment('recent_venues', ('venues',), lambda: [{
         "id": v.id,
         "name": v.name,
         "image_link": v.image_link,
-    } for v in Venue.query.order_by(Venue.id.desc()).limit(6).all()]
+    } for v in Venue.query.order_by(Venue.id.desc()).limit(6).all()])
 
     # recent artists
-    ra = [{
+    ra = cached_fragment('recent_artists', ('artists',), lambda: [{
         "id": a.id,
         "name": a.name,
         "image_link": a.image_link,
-    } for a in Artist.query.order_by(Artist.id.desc()).limit(6).all()]
+    } for a in Artist.query.order_by(Artist.id.desc()).limit(6).all()])
 
     return render_template('pages/home.html', recent_venues=rv, recent_artists=ra)
 
@@ -29,36 +50,27 @@ def index():
 #  ----------------------------------------------------------------
 
 @app.route('/venues')
+@conditional(lambda: collection_stamp(Venue, Show) + (time_bucket(),))
+@cached_page('venues', 'shows')
 def venues():
     # DONE: replace with real venues data.
     #       num_shows should be aggregated based on number of upcoming shows per venue.
-    # Sorry future me, I can't explain how does it work
-    venues: List[Venue] = Venue.query.all()
-    locations = {}
-
-    for v in venues:
-        lc = (v.city, v.state)
-        if lc in locations:
-            locations[lc].append(v)
-        else:
-            locations[lc] = [v]
-
-    data = []
-    for lc, venues in sorted(locations.items()):
-        data.append({
-            "city": lc[0],
-            "state": lc[1],
-            "venues": [{
-                "id": v.id,
-                "name": v.name,
-                # we don't need this, do we?
-                # "num_upcoming_shows": Show.query.filter(
-                #     Show.venue_id == v.id,
-                #     Show.start_time > datetime.now()
-                # ).count()
-            } for v in venues]
-        })
-    return render_template('pages/venues.html', areas=data)
+    # areas are paginated, and only the venues of the current page of areas are loaded
+    page = page_or_400(venue_areas(), (Venue.state, Venue.city), limit=app.config.get('AREAS_PER_PAGE', 10))
+    venues = venues_in_areas(page.items).yield_per(100) if page.items else []
+    counts = {(a.state, a.city): a.num_upcoming_shows for a in page}
+
+    # venues come ordered by area, so they are grouped as they stream in
+    data = ({
+        "city": city,
+        "state": state,
+        "num_upcoming_shows": counts[(state, city)],
+        "venues": ({
+            "id": v.id,
+            "name": v.name,
+        } for v in area_venues)
+    } for (state, city), area_venues in groupby(venues, key=lambda v: (v.state, v.city)))
+    return render_list('pages/venues.html', areas=data, page=page)
 
 
 @app.route('/venues/search', methods=['POST'])
@@ -67,20 +79,14 @@ def search_venues():
     # search for Hop should return "The Musical Hop".
     # search for "Music" should return "The Musical Hop" and "Park Square Live Music & Coffee"
     if request.form.get("search_term"):
-        # https://stackoverflow.com/questions/42579400/search-function-query-in-flask-sqlalchemy
-        venues: List[Venue] = Venue.query.filter(
-            Venue.name.ilike('%' + request.form['search_term'] + '%')
-        ).all()
-        now = datetime.now()
+        venues = search(Venue, request.form['search_term'])
+        upcoming = upcoming_show_counts(Show.venue_id, [v.id for v in venues])
         response = {
             "count": len(venues),
             "data": [{
                 "id": v.id,
                 "name": v.name,
-                "num_upcoming_shows": Show.query.filter(
-                    Show.venue_id == v.id,
-                    Show.start_time > now,
-                    )
+                "num_upcoming_shows": upcoming.get(v.id, 0),
             } for v in venues]
         }
         return render_template('pages/search_venues.html', results=response,
@@ -90,14 +96,18 @@ def search_venues():
 
 
 @app.route('/venues/<int:venue_id>')
+@conditional(venue_stamp)
 def show_venue(venue_id):
     # shows the venue page with the given venue_id
     # DONE: replace with real venue data from the venues table, using venue_id
-    v = Venue.query.get(venue_id)
+    found = entity_with_shows(Venue, Show.venue_id, venue_id, app.config.get('DETAIL_SHOWS_LIMIT', 30))
+    if found is None:
+        abort(404)
+    v, past, upcoming, past_count, upcoming_count = found
     data = {
         "id": v.id,
         "name": v.name,
-        "genres": v.genres,
+        "genres": list(v.genres),
         "address": v.address,
         "city": v.city,
         "state": v.state,
@@ -108,34 +118,36 @@ def show_venue(venue_id):
         "seeking_description": v.seeking_description,
         "image_link": v.image_link,
     }
-    now = datetime.now()
-
-    shows = db.session.query(Show)
-    join_venue = shows.join(Venue)
-    show_for_venue = join_venue.filter(Show.venue_id == venue_id)
-    past = show_for_venue.filter(Show.start_time <= now)
-    past_shows = past.all()
-
-    shows = db.session.query(Show)
-    join_venue = shows.join(Venue)
-    show_for_venue = join_venue.filter(Show.venue_id == venue_id)
-    upcoming = show_for_venue.filter(Show.start_time > now)
-    upcoming_shows = upcoming.all()
-
-    data['past_shows'] = list(map(show_to_dict, past_shows))
-    data['upcoming_shows'] = list(map(show_to_dict, upcoming_shows))
-    data['past_shows_count'] = len(past_shows)
-    data['upcoming_shows_count'] = len(upcoming_shows)
+    data['past_shows'] = list(map(show_to_dict, past))
+    data['upcoming_shows'] = list(map(show_to_dict, upcoming))
+    data['past_shows_count'] = past_count
+    data['upcoming_shows_count'] = upcoming_count
     return render_template('pages/show_venue.html', venue=data)
 
 
-def show_to_dict(show: Show) -> dict:
-    a: Artist = show.artist
+@app.route('/venues/<int:venue_id>/past-shows')
+@conditional(venue_stamp)
+def venue_past_shows(venue_id):
+    # every past show, archived ones included, newest first
+    venue = db.session.query(Venue.id, Venue.name).filter(Venue.id == venue_id).first()
+    if venue is None:
+        abort(404)
+    query, key = past_shows(Show.venue_id, venue_id)
+    page = page_or_400(query, key, descending=True)
+    return render_template('pages/past_shows.html', kind='venues', entity=venue,
+                           shows=map(show_to_dict, page), page=page)
+
+
+def show_to_dict(show) -> dict:
+    # `show` is a row of `show_listing()`, it already carries artist and venue columns
     return {
+        "venue_id": show.venue_id,
+        "venue_name": show.venue_name,
+        "venue_image_link": show.venue_image_link,
         "artist_id": show.artist_id,
-        "artist_name": a.name,
-        "artist_image_link": a.image_link,
-        "start_time": str(show.start_time),
+        "artist_name": show.artist_name,
+        "artist_image_link": show.artist_image_link,
+        "start_time": show.start_time,
     }
 
 
@@ -172,6 +184,7 @@ def create_venue_submission():
         )
         db.session.add(v)
         db.session.commit()
+        invalidate('venues')
         flash('Venue ' + request.form['name'] + ' was successfully listed!')
         return redirect(url_for('index'))
 
@@ -197,6 +210,7 @@ def delete_venue(venue_id):
         v = Venue.query.get(venue_id)
         db.session.delete(v)
         db.session.commit()
+        invalidate('venues')
         return jsonify({'success': True})
 
     except Exception as e:
@@ -213,13 +227,16 @@ def delete_venue(venue_id):
 #  Artists
 #  ----------------------------------------------------------------
 @app.route('/artists')
+@conditional(lambda: collection_stamp(Artist))
 def artists():
     # DONE: replace with real data returned from querying the database
-    data = [{
+    page = page_or_400(db.session.query(Artist.id, Artist.name), (Artist.name, Artist.id),
+                       stream=streaming_enabled())
+    data = ({
         "id": a.id,
         "name": a.name
-    } for a in Artist.query.all()]
-    return render_template('pages/artists.html', artists=data)
+    } for a in page)
+    return render_list('pages/artists.html', artists=data, page=page)
 
 @app.route('/artists/search', methods=['POST'])
 def search_artists():
@@ -227,20 +244,14 @@ def search_artists():
     # search for "A" should return "Guns N Petals", "Matt Quevado", and "The Wild Sax Band".
     # search for "band" should return "The Wild Sax Band".
     if request.form.get("search_term"):
-        # https://stackoverflow.com/questions/42579400/search-function-query-in-flask-sqlalchemy
-        artists: List[Artist] = Artist.query.filter(
-            Artist.name.ilike('%' + request.form['search_term'] + '%')
-        ).all()
-        now = datetime.now()
+        artists = search(Artist, request.form['search_term'])
+        upcoming = upcoming_show_counts(Show.artist_id, [a.id for a in artists])
         response = {
             "count": len(artists),
             "data": [{
                 "id": a.id,
                 "name": a.name,
-                "num_upcoming_shows": Show.query.filter(
-                    Show.artist_id == a.id,
-                    Show.start_time > now,
-                    )
+                "num_upcoming_shows": upcoming.get(a.id, 0),
             } for a in artists]
         }
         return render_template('pages/search_artists.html', results=response,
@@ -250,14 +261,18 @@ def search_artists():
 
 
 @app.route('/artists/<int:artist_id>')
+@conditional(artist_stamp)
 def show_artist(artist_id):
     # shows the venue page with the given venue_id
     # DONE: replace with real venue data from the venues table, using venue_id
-    a: Artist = Artist.query.get(artist_id)
+    found = entity_with_shows(Artist, Show.artist_id, artist_id, app.config.get('DETAIL_SHOWS_LIMIT', 30))
+    if found is None:
+        abort(404)
+    a, past, upcoming, past_count, upcoming_count = found
     data = {
         "id": a.id,
         "name": a.name,
-        "genres": a.genres,
+        "genres": list(a.genres),
         "city": a.city,
         "state": a.state,
         "phone": a.phone,
@@ -266,27 +281,26 @@ def show_artist(artist_id):
         "seeking_description": a.seeking_description,
         "image_link": a.image_link,
     }
-    now = datetime.now()
-
-    shows = db.session.query(Show)
-    join_artist = shows.join(Artist)
-    show_for_artist = join_artist.filter(Show.artist_id == artist_id)
-    past = show_for_artist.filter(Show.start_time <= now)
-    past_shows = past.all()
-
-    shows = db.session.query(Show)
-    join_artist = shows.join(Artist)
-    show_for_artist = join_artist.filter(Show.artist_id == artist_id)
-    upcoming = show_for_artist.filter(Show.start_time > now)
-    upcoming_shows = upcoming.all()
-
-    data['past_shows'] = list(map(show_to_dict, past_shows))
-    data['upcoming_shows'] = list(map(show_to_dict, upcoming_shows))
-    data['past_shows_count'] = len(past_shows)
-    data['upcoming_shows_count'] = len(upcoming_shows)
+    data['past_shows'] = list(map(show_to_dict, past))
+    data['upcoming_shows'] = list(map(show_to_dict, upcoming))
+    data['past_shows_count'] = past_count
+    data['upcoming_shows_count'] = upcoming_count
     return render_template('pages/show_artist.html', artist=data)
 
 
+@app.route('/artists/<int:artist_id>/past-shows')
+@conditional(artist_stamp)
+def artist_past_shows(artist_id):
+    # every past show, archived ones included, newest first
+    artist = db.session.query(Artist.id, Artist.name).filter(Artist.id == artist_id).first()
+    if artist is None:
+        abort(404)
+    query, key = past_shows(Show.artist_id, artist_id)
+    page = page_or_400(query, key, descending=True)
+    return render_template('pages/past_shows.html', kind='artists', entity=artist,
+                           shows=map(show_to_dict, page), page=page)
+
+
 #  Update
 #  ----------------------------------------------------------------
 @app.route('/artists/<int:artist_id>/edit', methods=['GET'])
@@ -309,6 +323,7 @@ def edit_artist_submission(artist_id):
     try:
         form.populate_obj(artist)
         db.session.commit()
+        invalidate('artists')
         flash("Artist is successfully edited")
     except Exception:
         db.session.rollback()
@@ -336,6 +351,7 @@ def edit_venue_submission(venue_id):
     try:
         form.populate_obj(venue)
         db.session.commit()
+        invalidate('venues')
         flash("Venue is successfully edited")
     except Exception:
         db.session.rollback()
@@ -373,6 +389,7 @@ def create_artist_submission():
         )
         db.session.add(a)
         db.session.commit()
+        invalidate('artists')
         flash('Artist ' + request.form['name'] + ' was successfully listed!')
         return redirect(url_for('index'))
 
@@ -390,23 +407,30 @@ def create_artist_submission():
     # DONE: on unsuccessful db insert, flash an error instead.
     # e.g., flash('An error occurred. Artist ' + data.name + ' could not be listed.')
 
+#  Genres
+#  ----------------------------------------------------------------
+
+@app.route('/genres/<name>')
+@conditional(lambda name: collection_stamp(Venue, Artist, Show) + (time_bucket(),))
+def show_genre(name):
+    genre = genre_listing(name, app.config.get('GENRE_PAGE_LIMIT', 30))
+    if genre is None:
+        abort(404)
+    return render_template('pages/show_genre.html', genre=genre)
+
+
 #  Shows
 #  ----------------------------------------------------------------
 
 @app.route('/shows')
+@conditional(lambda: collection_stamp(Show, Artist, Venue))
 def shows():
     # displays list of shows at /shows
     # DONE: replace with real venues data.
     #       num_shows should be aggregated based on number of upcoming shows per venue.
-    data = [{
-        "venue_id": sh.venue_id,
-        "venue_name": sh.venue.name,
-        "artist_id": sh.artist_id,
-        "artist_name": sh.artist.name,
-        "artist_image_link": sh.artist.image_link,
-        "start_time": str(sh.start_time),
-    } for sh in Show.query.all()]
-    return render_template('pages/shows.html', shows=data)
+    page = page_or_400(show_listing(), (ShowListing.start_time, ShowListing.id), stream=streaming_enabled())
+    data = map(show_to_dict, page)
+    return render_list('pages/shows.html', shows=data, page=page)
 
 
 @app.route('/shows/create')
@@ -434,6 +458,7 @@ def create_show_submission():
         )
         db.session.add(show)
         db.session.commit()
+        invalidate('shows')
         flash('Show was successfully listed!')
         return redirect(url_for('index'))
 
@@ -452,6 +477,56 @@ def create_show_submission():
     # see: http://flask.pocoo.org/docs/1.0/patterns/flashing/
 
 
+@app.route('/shows/create/tour')
+def create_tour():
+    form = TourForm()
+    return render_template('forms/new_tour.html', form=form)
+
+
+@app.route('/shows/create/tour', methods=['POST'])
+def create_tour_submission():
+    # many shows of one artist at once: listed dates plus an optional recurring one
+    form = TourForm(request.form)
+    if not form.validate_on_submit() or not form.artist_id.data.strip().isdigit():
+        flash('Invalid form!')
+        return render_template('forms/new_tour.html', form=form)
+
+    dates, errors = parse_dates(form.dates.data or '')
+    limit = app.config.get('TOUR_MAX_SHOWS', 500)
+    repeat_count = form.repeat_count.data or 0
+    if repeat_count and (not (form.repeat_venue_id.data or '').strip().isdigit() or not form.repeat_start.data):
+        errors.append(('repeat', 'a recurring date needs a venue id and a first date'))
+    elif len(dates) + repeat_count > limit:
+        # checked before the recurring dates are made, not after
+        errors.append(('dates', 'at most %d shows per tour' % limit))
+    elif repeat_count:
+        try:
+            dates += recurring_dates(int(form.repeat_venue_id.data), form.repeat_start.data,
+                                     form.repeat_every_days.data or 7, repeat_count)
+        except OverflowError:
+            errors.append(('repeat', 'the recurring dates run past the year 9999'))
+    if not dates and not errors:
+        errors.append(('dates', 'no dates given'))
+    elif dates and len(dates) <= limit:
+        errors += check_tour(int(form.artist_id.data), dates)
+    if errors:
+        # nothing is booked unless every date is fine
+        return render_template('forms/new_tour.html', form=form, errors=errors)
+
+    try:
+        book_tour(int(form.artist_id.data), dates)
+        invalidate('shows')
+        flash('%d shows were successfully listed!' % len(dates))
+        return redirect(url_for('index'))
+
+    except Exception:
+        db.session.rollback()
+        flash("An error occurred!")
+        return redirect(url_for('index'))
+    finally:
+        db.session.close()
+
+
 @app.errorhandler(404)
 def not_found_error(error):
     return render_template('errors/404.html'), 404
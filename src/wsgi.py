@@ -0,0 +1,32 @@
+"""Entry point for prefork servers.
+
+    gunicorn --preload --workers 4 src.wsgi:app
+
+With --preload the app is set up once in the master and every worker is
+forked from it, sharing the imported modules and warmed caches copy-on-write
+instead of loading its own copy. The database engines are created here but
+connect lazily; a forked worker drops any connection it inherited (see
+src.models.init_db). Without --preload each worker imports this module
+itself and nothing is shared, which still works.
+"""
+import gc
+
+from src.app import create_app
+
+
+def warm_up(app):
+    """Loads what is otherwise loaded on first use, so it happens once in
+    the master instead of once per worker."""
+    import dateutil.parser  # noqa: F401
+    from src.dates import PATTERNS, compiled_pattern
+    for format in PATTERNS:
+        compiled_pattern(format, app.config.get('BABEL_DEFAULT_LOCALE', 'en_US'))
+    for name in app.jinja_env.list_templates(extensions=['html']):
+        app.jinja_env.get_template(name)
+
+
+app = create_app()
+warm_up(app)
+# objects that survive to here live as long as the workers; keeping the
+# collector off them keeps it from writing to (and so copying) their pages
+gc.freeze()
@@ -0,0 +1,28 @@
+import pytest
+
+from src.app import create_app
+
+
+@pytest.fixture(scope='session')
+def app(tmp_path_factory):
+    """The app against a fresh SQLite database, which also stands in for a
+    read replica, without page caching so every request runs its view."""
+    uri = 'sqlite:///%s' % (tmp_path_factory.mktemp('db') / 'fyyur.sqlite')
+    app = create_app(overrides={
+        'SQLALCHEMY_DATABASE_URI': uri,
+        'SQLALCHEMY_REPLICA_URIS': [uri],
+        'SECRET_KEY': 'test',
+        'WTF_CSRF_ENABLED': False,
+        'CACHE_BACKEND': 'null',
+        'SEARCH_BACKEND': 'memory',
+    })
+    from src.models import db
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
@@ -0,0 +1,34 @@
+import os
+import time
+from datetime import datetime, timezone
+
+import pytest
+
+from src.models import db, Venue
+
+
+@pytest.fixture
+def local_time_not_utc():
+    previous = os.environ.get('TZ')
+    os.environ['TZ'] = 'America/New_York'
+    time.tzset()
+    yield
+    if previous is None:
+        del os.environ['TZ']
+    else:
+        os.environ['TZ'] = previous
+    time.tzset()
+
+
+def test_last_modified_is_utc(app, client, local_time_not_utc):
+    with app.app_context():
+        venue = Venue(name='Clock Venue', city='San Francisco', state='CA')
+        db.session.add(venue)
+        db.session.commit()
+        venue_id = venue.id
+    response = client.get('/venues/%d' % venue_id)
+    assert response.status_code == 200
+    assert abs((datetime.now(timezone.utc) - response.last_modified).total_seconds()) < 60
+    # and it revalidates against itself
+    response = client.get('/venues/%d' % venue_id, headers={'If-Modified-Since': response.headers['Last-Modified']})
+    assert response.status_code == 304
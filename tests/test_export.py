@@ -0,0 +1,53 @@
+from datetime import datetime
+
+import pytest
+
+from src.models import db, Artist, Show, Venue
+
+
+@pytest.mark.parametrize('fmt', ['csv', 'ndjson'])
+def test_exported_shows_import_again(app, tmp_path, fmt):
+    with app.app_context():
+        artist = Artist(name='Export Artist', city='San Francisco', state='CA')
+        venue = Venue(name='Export Venue', city='San Francisco', state='CA')
+        db.session.add_all([artist, venue])
+        db.session.flush()
+        db.session.add_all([Show(artist_id=artist.id, venue_id=venue.id,
+                                 start_time=datetime(2031, 3, day, 20, 30, 15, 123456)) for day in (1, 2, 3)])
+        db.session.commit()
+        shows = Show.query.count()
+
+    path = str(tmp_path / ('shows.' + fmt))
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=['export', 'shows', path, '--format', fmt])
+    assert result.exit_code == 0, result.output
+    result = runner.invoke(args=['import', 'shows', path])
+    assert result.exit_code == 0, result.output
+    assert 'done: %d shows' % shows in result.output
+    assert ', 0 rejected' in result.output
+    with app.app_context():
+        assert Show.query.count() == 2 * shows
+
+
+def test_import_requires_start_time_and_reads_iso(app, tmp_path):
+    with app.app_context():
+        artist = Artist(name='Import Artist', city='San Francisco', state='CA')
+        venue = Venue(name='Import Venue', city='San Francisco', state='CA')
+        db.session.add_all([artist, venue])
+        db.session.commit()
+        ids = artist.id, venue.id
+        shows = Show.query.count()
+    path = tmp_path / 'shows.csv'
+    path.write_text('artist_id,venue_id,start_time\n'
+                    '%d,%d,\n'
+                    '%d,%d,2031-05-01T20:00:00.5\n' % (ids + ids))
+    (tmp_path / 'no_start.csv').write_text('artist_id,venue_id\n%d,%d\n' % ids)
+
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=['import', 'shows', str(path)])
+    assert 'done: 1 shows' in result.output and ', 1 rejected' in result.output
+    result = runner.invoke(args=['import', 'shows', str(tmp_path / 'no_start.csv')])
+    assert 'done: 0 shows' in result.output and ', 1 rejected' in result.output
+    with app.app_context():
+        assert Show.query.count() == shows + 1
+        assert Show.query.order_by(Show.id.desc()).first().start_time == datetime(2031, 5, 1, 20, 0, 0, 500000)
@@ -0,0 +1,39 @@
+import time
+
+import pytest
+from flask import Flask, g
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import OperationalError
+
+from src.instrumentation import init_instrumentation
+
+
+class Engines:
+    """Stands in for the Flask-SQLAlchemy extension, with one engine."""
+
+    def __init__(self):
+        self.engines = {None: create_engine('sqlite://')}
+
+
+def test_failed_statements_leave_no_start_times_behind():
+    # an app of its own, so the hooks stay off the one the other tests use
+    app, db = Flask(__name__), Engines()
+    init_instrumentation(app, db)
+    engine = db.engines[None]
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def slow_down(conn, cursor, statement, *args):
+        if 'slow' in statement:
+            time.sleep(0.2)
+
+    with app.test_request_context(), engine.connect() as connection:
+        for _ in range(3):
+            with pytest.raises(OperationalError):
+                connection.execute(text('SELECT * FROM missing_table'))
+        connection.execute(text("SELECT 'slow'"))
+        connection.execute(text('SELECT 1'))
+        timings = {statement: ms for statement, _, ms in g.sql_queries}
+        # kept with the pooled connection, they would pile up for its lifetime
+        assert not connection.info.get('query_start')
+    assert timings["SELECT 'slow'"] >= 200
+    assert timings['SELECT 1'] < 100
@@ -0,0 +1,25 @@
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from src.models import db, Venue
+
+
+@pytest.mark.parametrize('path', ['/api/v1/venues?after=garbage', '/api/v1/artists?before=e30'])
+def test_api_invalid_cursor_is_a_json_400(client, path):
+    response = client.get(path)
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'invalid cursor'}
+
+
+@pytest.mark.parametrize('path', ['/venues?after=garbage', '/artists?after=garbage', '/shows?before=WzFd'])
+def test_page_invalid_cursor_is_a_400(client, path):
+    assert client.get(path).status_code == 400
+
+
+def test_sort_columns_are_not_null(app):
+    # keyset cursors compare row values, which would silently skip a NULL
+    with app.app_context():
+        db.session.add(Venue(name='Nowhere Hall', city=None, state='CA'))
+        with pytest.raises(IntegrityError):
+            db.session.commit()
+        db.session.rollback()
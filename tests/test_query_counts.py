@@ -0,0 +1,114 @@
+"""The list and detail pages run a fixed number of queries, however many
+rows they show or the database holds: no query per row (N+1)."""
+import pytest
+from sqlalchemy import event
+
+from benchmarks.seed import seed
+from src.models import db, venue_genres, Artist, Genre, Show, Venue
+
+ROUTES = [
+    '/',
+    '/venues',
+    '/artists',
+    '/shows',
+    '/venues/{venue}',
+    '/artists/{artist}',
+    '/venues/{venue}/past-shows',
+    '/artists/{artist}/past-shows',
+    '/genres/{genre}',
+    'POST /venues/search',
+    'POST /artists/search',
+    '/api/v1/venues',
+    '/api/v1/artists',
+    '/api/v1/shows',
+    '/api/v1/venues/{venue}',
+    '/api/v1/artists/{artist}',
+    '/api/v1/search/venues?q=a',
+]
+
+SCALE = 10
+
+
+def _counts(app, client, queries):
+    with app.app_context():
+        # the busiest venue and artist, their pages show the most shows
+        venue = max(Venue.query.all(), key=lambda v: len(v.shows)).id
+        artist = max(Artist.query.all(), key=lambda a: len(a.shows)).id
+        genre = db.session.query(Genre.name).join(venue_genres) \
+            .group_by(Genre.name).order_by(db.func.count().desc()).limit(1).scalar()
+        db.session.remove()
+    counts = {}
+    for route in ROUTES:
+        method, _, path = route.rpartition(' ')
+        path = path.format(venue=venue, artist=artist, genre=genre)
+        kwargs = {'data': {'search_term': 'a'}} if method == 'POST' else {}
+        client.open(path, method=method or 'GET', **kwargs).close()  # warm-up: search indexes, lazy caches
+        del queries[:]
+        response = client.open(path, method=method or 'GET', **kwargs)
+        assert response.status_code == 200, path
+        response.get_data()  # streamed pages run their queries while sent
+        response.close()
+        counts[route] = len(queries)
+    return counts
+
+
+@pytest.fixture(scope='module')
+def counts(app):
+    """Query counts of every route with N rows, then with SCALE * N."""
+    client, statements = app.test_client(), []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    with app.app_context():
+        engines = list(db.engines.values())  # the primary and the replica
+    for engine in engines:
+        event.listen(engine, 'before_cursor_execute', record)
+    try:
+        with app.app_context():
+            seed(10, 20, 100, random_seed=1, echo=lambda *_: None)
+        small = _counts(app, client, statements)
+        with app.app_context():
+            seed(10 * (SCALE - 1), 20 * (SCALE - 1), 100 * (SCALE - 1), random_seed=2, echo=lambda *_: None)
+        large = _counts(app, client, statements)
+    finally:
+        for engine in engines:
+            event.remove(engine, 'before_cursor_execute', record)
+    return small, large
+
+
+@pytest.mark.parametrize('route', ROUTES)
+def test_query_count_does_not_grow_with_rows(counts, route):
+    small, large = counts
+    assert large[route] == small[route]
+
+
+def test_tour_query_count_does_not_grow_with_dates(app, client):
+    with app.app_context():
+        artist = Artist(name='Counted Artist', city='San Francisco', state='CA')
+        venue = Venue(name='Counted Venue', city='San Francisco', state='CA')
+        db.session.add_all([artist, venue])
+        db.session.commit()
+        artist_id, venue_id = artist.id, venue.id
+        engines = list(db.engines.values())
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    counts = []
+    for year, size in ((2040, 2), (2041, 2 * SCALE)):
+        dates = '\n'.join('%d, %d-01-01 %02d:00' % (venue_id, year, hour) for hour in range(size))
+        for engine in engines:
+            event.listen(engine, 'before_cursor_execute', record)
+        try:
+            del statements[:]
+            response = client.post('/shows/create/tour', data={'artist_id': str(artist_id), 'dates': dates})
+        finally:
+            for engine in engines:
+                event.remove(engine, 'before_cursor_execute', record)
+        assert response.status_code == 302
+        counts.append(len(statements))
+    assert counts[0] == counts[1]
+    with app.app_context():
+        assert Show.query.filter_by(artist_id=artist_id).count() == 2 + 2 * SCALE
@@ -0,0 +1,30 @@
+from flask import session
+
+from src.models import db, Artist, Venue
+
+
+def _seed_artist_and_venue(app):
+    with app.app_context():
+        artist = Artist(name='Routing Artist', city='San Francisco', state='CA')
+        venue = Venue(name='Routing Venue', city='San Francisco', state='CA')
+        db.session.add_all([artist, venue])
+        db.session.commit()
+        return artist.id, venue.id
+
+
+def test_reads_go_to_a_replica(client):
+    with client:
+        client.get('/venues').close()
+        assert db.session.get_bind() is not db.engine
+
+
+def test_core_write_starts_the_read_your_writes_window(app, client):
+    # book_tour inserts the shows with a Core statement, not through a flush
+    artist_id, venue_id = _seed_artist_and_venue(app)
+    with client:
+        response = client.post('/shows/create/tour', data={
+            'artist_id': str(artist_id), 'dates': '%d, 2031-06-01 20:00' % venue_id})
+        assert response.status_code == 302
+        assert '_last_write' in session
+        client.get('/venues').close()
+        assert db.session.get_bind() is db.engine
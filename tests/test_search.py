@@ -0,0 +1,16 @@
+from src.cache import MemoryCache, invalidate
+from src.models import db, Venue
+from src.search import search
+
+
+def test_memory_index_follows_the_cache_tag(app, monkeypatch):
+    # a Core insert stands in for a write made by another process: this one's
+    # ORM events never see it, only the bumped tag version
+    monkeypatch.setitem(app.extensions, 'cache', MemoryCache())
+    with app.test_request_context():
+        assert search(Venue, 'Qwertyuiop Hall') == []
+        db.session.execute(Venue.__table__.insert().values(name='Qwertyuiop Hall', city='San Francisco', state='CA'))
+        db.session.commit()
+        assert search(Venue, 'Qwertyuiop Hall') == []
+        invalidate('venues')
+        assert [hit.name for hit in search(Venue, 'Qwertyuiop Hall')] == ['Qwertyuiop Hall']
@@ -0,0 +1,14 @@
+import pytest
+
+from src.models import db
+
+
+@pytest.mark.parametrize('path', ['/shows', '/venues', '/artists'])
+def test_streamed_page_returns_its_connection(app, client, path):
+    assert app.config['STREAM_LIST_PAGES']
+    response = client.get(path)
+    assert response.is_streamed
+    response.get_data()
+    response.close()
+    with app.app_context():
+        assert all(engine.pool.checkedout() == 0 for engine in db.engines.values())
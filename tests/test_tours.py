@@ -0,0 +1,31 @@
+import pytest
+
+from src.models import Show
+
+
+@pytest.mark.parametrize('repeat, error', [
+    # more than TOUR_MAX_SHOWS, refused before the dates are made
+    ({'repeat_count': '499', 'repeat_start': '2030-01-01 20:00'}, 'at most 500 shows per tour'),
+    # past datetime.max
+    ({'repeat_count': '5', 'repeat_every_days': '365', 'repeat_start': '9998-01-01 20:00'},
+     'the recurring dates run past the year 9999'),
+])
+def test_tour_out_of_bounds_is_a_form_error(app, client, repeat, error):
+    data = {'artist_id': '1', 'repeat_venue_id': '1',
+            'dates': '1, 2030-01-01 20:00\n1, 2030-01-02 20:00', **repeat}
+    with app.app_context():
+        before = Show.query.count()
+    response = client.post('/shows/create/tour', data=data)
+    assert response.status_code == 200
+    assert error in response.get_data(as_text=True)
+    with app.app_context():
+        assert Show.query.count() == before
+
+
+@pytest.mark.parametrize('field, value', [('repeat_count', '2000000'), ('repeat_every_days', '100000')])
+def test_tour_repeat_fields_are_bounded(client, field, value):
+    data = {'artist_id': '1', 'repeat_venue_id': '1', 'repeat_start': '2030-01-01 20:00',
+            'repeat_count': '2', field: value}
+    response = client.post('/shows/create/tour', data=data)
+    assert response.status_code == 200
+    assert 'Invalid form!' in response.get_data(as_text=True)